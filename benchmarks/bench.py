@@ -0,0 +1,148 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from graphs import FAMILIES, generate, write_edges
+from utilize.loader import Graph
+from utilize.pool import GraphPool
+from utilize.sir import SIR, sir_node
+from utilize.tool import beta_threshold, CSR_SUFFIX
+
+
+ENGINES = ("percolation", "csr", "gillespie", "ndlib")
+
+
+def timed(fn, repeat):
+    # 取 repeat 次中最快的一次，减少机器抖动的影响
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_graph(family, n, args, pools, results):
+    name = f"{family}-{n}"
+    path = write_edges(generate(family, n, args.seed), args.workdir, name)
+
+    def cold():
+        shutil.rmtree(path + CSR_SUFFIX, ignore_errors=True)
+        Graph(path)
+
+    results[f"load/cold/{name}"] = {"seconds": timed(cold, args.repeat)}
+    results[f"load/warm/{name}"] = {"seconds": timed(lambda: Graph(path), args.repeat)}
+    G = Graph(path)
+    N = G.number_of_nodes()
+    results[f"threshold/{name}"] = {"seconds": timed(lambda: beta_threshold(G), args.repeat)}
+    beta = min(1.0, 1.5 * beta_threshold(G))
+
+    hub = G.nodes()[int(np.argmax(np.diff(G.indptr)))]
+    for workers, pool in pools.items():
+        if n <= args.ndlib_max_nodes:
+            seconds = timed(lambda: sir_node(G, beta, 1, hub, args.trials, pool=pool), args.repeat)
+            results[f"sir_node/{name}/w{workers}"] = {"seconds": seconds, "sims_per_sec": args.trials / seconds}
+        for engine in args.engines:
+            if engine == "ndlib" and n > args.ndlib_max_nodes:
+                continue
+            seconds = timed(lambda: SIR(G, beta, 1, args.trials, engine, args.seed, pool=pool), args.repeat)
+            results[f"sir/{engine}/{name}/w{workers}"] = {"seconds": seconds, "sims_per_sec": N * args.trials / seconds}
+        pool.release()
+
+
+def run(args):
+    args.workdir = args.workdir or tempfile.mkdtemp(prefix="sir-bench-")
+    results = {}
+    pools = {w: GraphPool(workers=w) for w in args.workers}
+    try:
+        for family in args.families:
+            for n in args.sizes:
+                bench_graph(family, n, args, pools, results)
+                print(f"Benchmarked: {family}-{n}", file=sys.stderr)
+    finally:
+        for pool in pools.values():
+            pool.close()
+        if not args.keep:
+            shutil.rmtree(args.workdir, ignore_errors=True)
+
+    report = {
+        "meta": {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(), "numpy": np.__version__,
+                 "machine": platform.machine(), "cpus": os.cpu_count(), "trials": args.trials, "repeat": args.repeat,
+                 "seed": args.seed},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+def compare(args):
+    # 当前耗时 / 基线耗时 > 1 + threshold 的项目判为变慢；两边都短于 min_seconds 的项目只列出不判定 (计时噪声太大)。
+    # 有变慢时以返回码 1 退出，便于接到 CI
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    with open(args.current, "r", encoding="utf-8") as f:
+        current = json.load(f)["results"]
+
+    slower = []
+    for name in sorted(set(baseline) & set(current)):
+        ratio = current[name]["seconds"] / max(baseline[name]["seconds"], 1e-9)
+        flag = "SLOWER" if ratio > 1 + args.threshold else ("faster" if ratio < 1 / (1 + args.threshold) else "")
+        if max(baseline[name]["seconds"], current[name]["seconds"]) < args.min_seconds:
+            flag = ""
+        print(f"{name:<45} {baseline[name]['seconds']:>10.4f} {current[name]['seconds']:>10.4f} {ratio:>7.2f}x  {flag}")
+        if flag == "SLOWER":
+            slower.append(name)
+    for name in sorted(set(baseline) ^ set(current)):
+        print(f"{name:<45} only in {'baseline' if name in baseline else 'current'}")
+
+    print(f"{len(slower)} slowdown(s) beyond {args.threshold:.0%}")
+    return 1 if slower else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the SIR pipeline on synthetic graph families.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="Run the benchmarks and emit JSON")
+    p.add_argument("--families", nargs="+", default=list(FAMILIES), choices=FAMILIES)
+    p.add_argument("--sizes", nargs="+", type=int, default=[500, 2000])
+    p.add_argument("--engines", nargs="+", default=list(ENGINES), choices=ENGINES)
+    p.add_argument("--workers", nargs="+", type=int, default=sorted({1, os.cpu_count()}), help="Pool sizes to time")
+    p.add_argument("--trials", type=int, default=20, help="Trials per node")
+    p.add_argument("--repeat", type=int, default=3, help="Keep the fastest of this many runs")
+    p.add_argument("--seed", type=int, default=0, help="Seed for graph generation and simulation")
+    p.add_argument("--ndlib-max-nodes", type=int, default=500, help="Skip the ndlib reference engine on larger graphs")
+    p.add_argument("--workdir", type=str, default=None, help="Where generated edge lists go (default: a temp folder)")
+    p.add_argument("--keep", action="store_true", help="Keep the generated edge lists")
+    p.add_argument("--output", type=str, default=None, help="Write JSON here instead of stdout")
+
+    p = sub.add_parser("compare", help="Flag slowdowns of a run against a stored baseline")
+    p.add_argument("baseline", type=str)
+    p.add_argument("current", type=str)
+    p.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown to flag (0.2 = 20%%)")
+    p.add_argument("--min-seconds", type=float, default=0.01, help="Do not flag timings shorter than this")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
+    # python benchmarks/bench.py run --output baseline.json
+    # python benchmarks/bench.py run --output current.json && python benchmarks/bench.py compare baseline.json current.json
@@ -0,0 +1,36 @@
+import os
+
+import numpy as np
+import networkx as nx
+
+
+FAMILIES = ("er", "ba", "ws", "powerlaw")
+MEAN_DEGREE = 8
+
+
+def generate(family, n, seed=0):
+    # 同一 (family, n, seed) 总是生成同一张图，基准之间才能比较
+    if family == "er":
+        return nx.gnm_random_graph(n, n * MEAN_DEGREE // 2, seed=seed)
+    if family == "ba":
+        return nx.barabasi_albert_graph(n, MEAN_DEGREE // 2, seed=seed)
+    if family == "ws":
+        return nx.connected_watts_strogatz_graph(n, MEAN_DEGREE, 0.1, seed=seed)
+    if family == "powerlaw":
+        # 重尾度序列 (Zipf 指数 2.2，最大度截断在 N-1) 的配置模型，去掉重边和自环
+        rng = np.random.default_rng(seed)
+        degrees = np.minimum(rng.zipf(2.2, size=n) + 1, n - 1)
+        degrees[np.argmin(degrees)] += degrees.sum() % 2
+        G = nx.Graph(nx.configuration_model(degrees.tolist(), seed=seed))
+        G.remove_edges_from(list(nx.selfloop_edges(G)))
+        return G
+    raise ValueError(f"unknown graph family: {family}")
+
+
+def write_edges(G, folder, name):
+    # 按 Networks/ 的格式写成 <name>/<name>.txt，返回文件路径
+    os.makedirs(os.path.join(folder, name), exist_ok=True)
+    path = os.path.join(folder, name, f"{name}.txt")
+    edges = np.array(list(G.edges()), dtype=np.int64).reshape(-1, 2)
+    np.savetxt(path, edges, fmt="%d")
+    return path
@@ -0,0 +1,68 @@
+import time
+
+STARTED = time.perf_counter()
+
+import os
+import sys
+import argparse
+import importlib
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+# 子命令 -> (模块, 说明)。模块在选定子命令之后才导入，每个子命令只付自己依赖的导入开销；
+# 本文件顶层只用标准库，spawn 启动的子进程重新导入主模块时几乎没有代价
+COMMANDS = {
+    "run": ("utilize.driver", "Simulate every network under base.networks_path (config.yaml)"),
+    "ingest": ("script.ingest", "Read .edges files out of zip/tar archives into the CSR format"),
+    "bench": ("benchmarks.bench", "Benchmark the pipeline on synthetic graph families (run / compare)"),
+    "index": ("script.index", "Build or update the SQLite index of saved results"),
+    "worker": ("script.worker", "Lease simulation tasks from a cluster coordinator"),
+}
+
+
+def startup_report(command):
+    # 从进程创建到子命令模块导入完成的时间 (含解释器自身启动)，已导入的模块数与当前常驻内存
+    from utilize.metrics import current_rss, process_age
+
+    seconds = process_age()
+    if seconds is None:
+        seconds = time.perf_counter() - STARTED
+    return {"command": command, "seconds": seconds, "modules": len(sys.modules), "rss": current_rss()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SIR node-influence toolkit.",
+                                     epilog="Run '%(prog)s <command> --help' for the options of a command.")
+    parser.add_argument("command", choices=COMMANDS, metavar="command",
+                        help="; ".join(f"{name}: {text}" for name, (_, text) in COMMANDS.items()))
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Options passed on to the command")
+    args = parser.parse_args()
+
+    module, _ = COMMANDS[args.command]
+    sys.path.insert(0, ROOT)
+    if module.startswith("benchmarks."):
+        # bench.py 按脚本方式导入同目录的 graphs
+        sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+    module = importlib.import_module(module)
+    # 子命令自己的 argparse 用 "cli.py <command>" 作程序名
+    sys.argv = [f"{os.path.basename(sys.argv[0])} {args.command}"] + args.args
+    startup = startup_report(args.command)
+    print(f"startup {startup['seconds']:.2f}s, {startup['modules']} modules, rss {startup['rss'] / (1 << 20):.0f} MiB",
+          file=sys.stderr)
+
+    if args.command == "run":
+        if args.args:
+            parser.error("run takes no options, it is configured by config.yaml")
+        module.main(startup=startup)
+    else:
+        sys.exit(module.main(args.args))
+
+
+if __name__ == "__main__":
+    main()
+    # python cli.py run
+    # python cli.py ingest downloads/ --delete
+    # python cli.py bench run --output baseline.json
+    # python cli.py index --rebuild
+    # python cli.py worker coordinator-host:5555
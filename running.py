@@ -1,37 +1,15 @@
-import os
-from tqdm import tqdm
+# 入口脚本：python running.py 等同于 python cli.py run，实际的驱动逻辑在 utilize/driver.py。
+# forkserver / spawn 启动的每个 worker 都会把主模块当作 __mp_main__ 重新执行一遍，
+# 所以这里在模块顶层不导入任何东西；running.run / running.config 等旧用法按需转到 utilize.driver
 
 
-from utilize.sir import SIR
-from utilize.loader import Graph, load_config, load_betas
-from utilize.tool import name_to_path
-from utilize.save import save_json, save_networks, create_folder
-from tqdm import tqdm
+def __getattr__(name):
+    from utilize import driver
 
+    return getattr(driver, name)
 
-config = load_config("./config.yaml")
 
-base_path = config["base"]["networks_path"]
-networks = [
-    name for name in os.listdir(base_path)
-    if os.path.isdir(os.path.join(base_path, name))
-]
+if __name__ == "__main__":
+    from utilize.driver import main
 
-for network_name in tqdm(networks, desc="Networks", unit="net"):
-
-    if os.path.exists(os.path.join(config["base"]["save_path"], network_name, f"{network_name}.txt")):        
-        continue
-
-    network_path = name_to_path(network_name, config["base"]["networks_path"])
-
-    G = Graph(network_path)
-
-    betas = load_betas(G, config)
-
-    target_folder, base_name = create_folder(config["base"]["save_path"], network_path)
-
-    for beta in tqdm(betas, desc=f"Betas for {network_name}", leave=False, unit="β"):
-        results = SIR(G, beta, config["training"]["gamma"], config["training"]["trials"])
-        save_json(target_folder, results, base_name, beta)
-    
-    save_networks(network_path, target_folder)
+    main()
@@ -1,13 +1,14 @@
 import os
 import re
 import sys
-import time
+import json
+import asyncio
 import argparse
 import logging
 from urllib.parse import urljoin, urlparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 from tqdm import tqdm
 
@@ -44,11 +45,8 @@ def is_download_link(href: str):
     return False
 
 
-def fetch_page_links(url: str, session: requests.Session, timeout=20):
-    logger.info(f"Fetching page: {url}")
-    r = session.get(url, timeout=timeout)
-    r.raise_for_status()
-    soup = BeautifulSoup(r.text, "html.parser")
+def parse_links(html: str, url: str):
+    soup = BeautifulSoup(html, "html.parser")
     links = set()
     for a in soup.find_all("a", href=True):
         href = a["href"].strip()
@@ -56,8 +54,7 @@ def fetch_page_links(url: str, session: requests.Session, timeout=20):
         abs_url = urljoin(url, href)
         if is_download_link(abs_url):
             links.add(abs_url)
-    logger.info(f"Found {len(links)} candidate download links on the page.")
-    return sorted(links)
+    return links
 
 
 def make_filename_from_url(url: str):
@@ -74,151 +71,231 @@ def make_filename_from_url(url: str):
     return name
 
 
-def head_file_size(url: str, session: requests.Session, timeout=20):
-    try:
-        r = session.head(url, allow_redirects=True, timeout=timeout)
-        if r.status_code >= 400:
-            return None
-        size = r.headers.get("Content-Length")
-        return int(size) if size and size.isdigit() else None
-    except Exception:
-        return None
-
-
-def download_one(url: str, out_dir: str, session: requests.Session, timeout=60, max_retries=3):
-    local_name = make_filename_from_url(url)
-    out_path = os.path.join(out_dir, local_name)
-    tmp_path = out_path + ".part"
-
-    # 如果已经完整存在并大小一致 -> 跳过
-    remote_size = head_file_size(url, session)
-    if os.path.exists(out_path) and remote_size is not None:
-        if os.path.getsize(out_path) == remote_size:
-            logger.info(f"Skip (exists & size match): {local_name}")
-            return ("skipped", url, out_path)
-
-    # 支持断点续传（如果服务器支持 Accept-Ranges）
-    resume_byte_pos = 0
-    if os.path.exists(tmp_path):
-        resume_byte_pos = os.path.getsize(tmp_path)
-
-    headers = {"User-Agent": "Mozilla/5.0 (compatible; nr-scraper/1.0)"}
-    if resume_byte_pos > 0:
-        headers["Range"] = f"bytes={resume_byte_pos}-"
-
-    attempt = 0
-    while attempt < max_retries:
-        attempt += 1
+def preallocate(path, size):
+    """
+    把文件扩到 size 字节并向文件系统预留空间；不支持 fallocate 的平台或文件系统退回稀疏文件
+    """
+    with open(path, "r+b") as f:
         try:
-            with session.get(url, headers=headers, stream=True, timeout=timeout, allow_redirects=True) as r:
-                if r.status_code in (416,):  # Range not satisfiable (maybe file complete)
-                    if os.path.exists(tmp_path):
-                        os.rename(tmp_path, out_path)
-                        logger.info(f"Renamed partial to final (status 416): {local_name}")
-                        return ("downloaded", url, out_path)
-                    else:
-                        raise RuntimeError(f"Range not satisfiable and no partial file for {url}")
-                if r.status_code >= 400:
-                    raise RuntimeError(f"HTTP {r.status_code} for {url}")
-
-                # 获取总大小（用于进度条）
-                total = None
-                cl = r.headers.get("Content-Length")
-                if cl and cl.isdigit():
-                    total = int(cl)
-                    # 如果是 Range 请求， total 是剩余大小；合并计算显示总远端大小时需要加 resume_byte_pos
-                    if "Range" in headers:
-                        total += resume_byte_pos
-
-                mode = "ab" if resume_byte_pos > 0 else "wb"
-                chunk_size = 1024 * 32
-                # 使用 tqdm 显示进度
-                with open(tmp_path, mode) as f, tqdm(
-                    total=total,
-                    unit="B",
-                    unit_scale=True,
-                    unit_divisor=1024,
-                    initial=resume_byte_pos,
-                    desc=local_name,
-                    leave=False,
-                ) as pbar:
-                    for chunk in r.iter_content(chunk_size=chunk_size):
-                        if chunk:
-                            f.write(chunk)
-                            pbar.update(len(chunk))
-                # 下载完成，重命名
-                os.replace(tmp_path, out_path)
-                logger.info(f"Downloaded: {local_name}")
-                return ("downloaded", url, out_path)
+            os.posix_fallocate(f.fileno(), 0, size)
+        except (AttributeError, OSError):
+            f.truncate(size)
+
+
+class HostLimiter:
+    """
+    每个主机相邻两次请求至少间隔 interval 秒；不同主机互不影响
+    """
+    def __init__(self, interval):
+        self.interval = interval
+        self.next_slot = {}
+
+    async def wait(self, url):
+        if self.interval <= 0:
+            return
+        host = urlparse(url).netloc
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self.next_slot.get(host, now))
+        self.next_slot[host] = slot + self.interval
+        await asyncio.sleep(slot - now)
+
+
+class Fetcher:
+    """
+    asyncio 调度的下载器：connections 个连接的共享连接池 (同时在途的请求数也不超过它)，
+    每个主机限速，支持 Range 的大文件拆成 part_size 的分段并行下载。
+    阻塞的 requests 调用放在线程里执行，事件循环只负责调度
+    """
+    def __init__(self, connections=8, delay=1.0, timeout=60, part_size=8 << 20, max_retries=3, session=None):
+        self.session = session or requests.Session()
+        self.session.headers.setdefault("User-Agent", "Mozilla/5.0 (compatible; nr-scraper/1.0)")
+        adapter = HTTPAdapter(pool_connections=connections, pool_maxsize=connections, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.slots = asyncio.Semaphore(connections)
+        self.limiter = HostLimiter(delay)
+        self.timeout = timeout
+        self.part_size = part_size
+        self.max_retries = max_retries
+
+    def close(self):
+        self.session.close()
+
+    async def call(self, url, fn, *args):
+        # 先排主机的时间槽再占连接，避免限速等待时占着连接
+        await self.limiter.wait(url)
+        async with self.slots:
+            return await asyncio.to_thread(fn, *args)
+
+    async def retry(self, url, fn, *args):
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                return await self.call(url, fn, *args)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"[Attempt {attempt}/{self.max_retries}] Error fetching {url}: {e}")
+                await asyncio.sleep(2 ** attempt)  # 指数退避
+
+    def _page(self, url):
+        r = self.session.get(url, timeout=self.timeout)
+        r.raise_for_status()
+        return r.text
+
+    async def crawl(self, pages):
+        # 并发抓取多个列表页，返回所有下载链接 (去重、排序)
+        async def one(url):
+            logger.info(f"Fetching page: {url}")
+            links = parse_links(await self.retry(url, self._page, url), url)
+            logger.info(f"Found {len(links)} candidate download links on {url}")
+            return links
+
+        found = await asyncio.gather(*(one(url) for url in pages), return_exceptions=True)
+        links = set()
+        for url, result in zip(pages, found):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to fetch page {url}: {result}")
+            else:
+                links |= result
+        return sorted(links)
+
+    def _get(self, url, tmp_path, start, end, pbar, probe=None):
+        # 下载 [start, end] 写到 tmp_path 的对应位置。probe 不为 None 时是首个请求：
+        # 根据响应判断服务器是否支持分段 (206 / 200)，把是否分段和文件总大小写进 probe
+        with self.session.get(url, headers={"Range": f"bytes={start}-{end}"}, stream=True, timeout=self.timeout,
+                              allow_redirects=True) as r:
+            if r.status_code >= 400:
+                raise RuntimeError(f"HTTP {r.status_code} for {url}")
+            ranged = r.status_code == 206
+            if probe is not None:
+                total = r.headers.get("Content-Range", "").rpartition("/")[2] if ranged else r.headers.get("Content-Length")
+                probe.update(ranged=ranged, total=int(total) if total and total.isdigit() else None)
+                if probe["stop"]():
+                    return 0
+                if pbar.total is None and probe["total"] is not None:
+                    pbar.total = probe["total"]
+                    pbar.refresh()
+            elif not ranged:
+                raise RuntimeError(f"Server ignored Range request for {url}")
+            written = 0
+            with open(tmp_path, "r+b") as f:
+                f.seek(start)
+                for chunk in r.iter_content(chunk_size=1 << 20):
+                    f.write(chunk)
+                    written += len(chunk)
+                    pbar.update(len(chunk))
+        if probe is not None and not ranged:
+            probe["total"] = written
+        return written
+
+    async def download(self, url, out_dir):
+        # 第一个请求直接带 Range 取第一段：返回 206 说明支持分段，剩余分段并行下载；
+        # 返回 200 就是整个文件，单流写完。不再为每个文件先发一次 HEAD
+        local_name = make_filename_from_url(url)
+        out_path = os.path.join(out_dir, local_name)
+        tmp_path = out_path + ".part"
+        done_path = tmp_path + ".json"
+        probe = {"stop": lambda: os.path.exists(out_path) and os.path.getsize(out_path) == probe["total"]}
+
+        # 已完成的分段记在 <文件>.part.json 里，中断后只补下缺的分段
+        done = {}
+        if os.path.exists(tmp_path) and os.path.exists(done_path):
+            with open(done_path, "r", encoding="utf-8") as f:
+                done = json.load(f)
+        else:
+            open(tmp_path, "wb").close()
+
+        def mark(part):
+            done.setdefault("parts", []).append(part)
+            with open(done_path, "w", encoding="utf-8") as f:
+                json.dump(done, f)
+
+        try:
+            with tqdm(total=done.get("total"), unit="B", unit_scale=True, unit_divisor=1024, desc=local_name, leave=False) as pbar:
+                finished = set(done.get("parts", []))
+                if 0 not in finished:
+                    await self.retry(url, self._get, url, tmp_path, 0, self.part_size - 1, pbar, probe)
+                    if probe["stop"]():
+                        os.remove(tmp_path)
+                        logger.info(f"Skip (exists & size match): {local_name}")
+                        return ("skipped", url, out_path)
+                    if done.get("total") not in (None, probe["total"]):
+                        # 远端文件变了，之前的分段作废
+                        finished = set()
+                        done = {}
+                    done["total"] = probe["total"]
+                    mark(0)
+                    ranged = probe["ranged"]
+                else:
+                    ranged = True
+                total = done["total"]
+                if ranged and total is not None and os.path.getsize(tmp_path) < total:
+                    # 一次分配到最终大小，各分段只往自己的位置写
+                    preallocate(tmp_path, total)
+                if ranged and total is not None and total > self.part_size:
+                    starts = range(self.part_size, total, self.part_size)
+                    todo = [s for s in starts if s // self.part_size not in finished]
+
+                    async def part(s):
+                        await self.retry(url, self._get, url, tmp_path, s, min(s + self.part_size, total) - 1, pbar)
+                        mark(s // self.part_size)
+
+                    # 等所有分段结束再报错，失败之后才完成的分段也记进 .part.json
+                    errors = [e for e in await asyncio.gather(*(part(s) for s in todo), return_exceptions=True) if e is not None]
+                    if errors:
+                        raise errors[0]
+                if total is not None and os.path.getsize(tmp_path) != total:
+                    raise RuntimeError(f"size mismatch for {url}: {os.path.getsize(tmp_path)} != {total}")
+            os.replace(tmp_path, out_path)
+            if os.path.exists(done_path):
+                os.remove(done_path)
+            logger.info(f"Downloaded: {local_name}")
+            return ("downloaded", url, out_path)
         except Exception as e:
-            logger.warning(f"[Attempt {attempt}/{max_retries}] Error downloading {url}: {e}")
-            time.sleep(2 ** attempt)  # 指数退避
-            # 如果是续传失败，下次尝试删除部分文件并从头开始
-            if os.path.exists(tmp_path) and attempt == max_retries:
-                logger.info("Max retries reached; leaving partial file for inspection.")
-                return ("failed", url, str(e))
-    return ("failed", url, "max_retries_exceeded")
+            logger.warning(f"Error downloading {url}: {e}; leaving partial file for resume.")
+            return ("failed", url, str(e))
+
+
+async def crawl_and_download(pages, out_dir, **kwargs):
+    fetcher = Fetcher(**kwargs)
+    try:
+        links = await fetcher.crawl(pages)
+        if not links:
+            logger.warning("No download links found.")
+            return []
+        logger.info(f"Preparing to download {len(links)} files")
+        return await asyncio.gather(*(fetcher.download(link, out_dir) for link in links))
+    finally:
+        fetcher.close()
 
 
 def main():
-    parser = argparse.ArgumentParser(description="Scrape asn.php page for download links and download files.")
-    parser.add_argument("--url", type=str, default="https://networkrepository.com/bio.php", help="Page URL to scrape")
+    parser = argparse.ArgumentParser(description="Scrape listing pages for download links and download files.")
+    parser.add_argument("--url", type=str, nargs="+", default=["https://networkrepository.com/bio.php"], help="Page URL(s) to scrape")
     parser.add_argument("--output", type=str, default="./downloads", help="Output directory")
-    parser.add_argument("--concurrency", type=int, default=3, help="Number of concurrent downloads")
-    parser.add_argument("--delay", type=float, default=1.0, help="Delay (s) between page fetches / requests to be polite")
+    parser.add_argument("--concurrency", type=int, default=8, help="Size of the connection pool (max requests in flight)")
+    parser.add_argument("--delay", type=float, default=0.5, help="Minimum delay (s) between two requests to the same host")
+    parser.add_argument("--part-size", type=int, default=8, help="Split size (MiB) for parallel ranged downloads")
     parser.add_argument("--timeout", type=int, default=60, help="Request timeout in seconds")
     args = parser.parse_args()
 
     os.makedirs(args.output, exist_ok=True)
+    results = asyncio.run(crawl_and_download(args.url, args.output, connections=args.concurrency, delay=args.delay,
+                                             timeout=args.timeout, part_size=args.part_size << 20))
 
-    session = requests.Session()
-    session.headers.update({"User-Agent": "Mozilla/5.0 (compatible; nr-scraper/1.0)"})
-
-    try:
-        links = fetch_page_links(args.url, session, timeout=args.timeout)
-        if not links:
-            logger.warning("No download links found. Exiting.")
-            return
-
-        # 你可以在这里扩展：如果页面有多个分页或更多相关页面，需要把那些页面的 URL 也加入 links_to_scrape 并重复抓取。
-        # 默认只抓取传入的页面上发现的链接。
-        logger.info(f"Preparing to download {len(links)} files with concurrency={args.concurrency}")
-
-        results = []
-        # 使用线程池并发下载
-        with ThreadPoolExecutor(max_workers=args.concurrency) as exe:
-            future_to_url = {}
-            # 先给每个下载任务做一点延迟排布，避免瞬时并发冲击
-            for i, link in enumerate(links):
-                # 包装一个小 closure 来稍微延迟提交（可以根据需要删除）
-                future = exe.submit(download_one, link, args.output, session, args.timeout, 3)
-                future_to_url[future] = link
-                time.sleep(args.delay / max(1, args.concurrency))  # 防止高并发瞬间炸掉目标站点
-
-            # 收集结果
-            for fut in as_completed(future_to_url):
-                try:
-                    res = fut.result()
-                    results.append(res)
-                except Exception as e:
-                    link = future_to_url.get(fut, "<unknown>")
-                    logger.error(f"Download task raised for {link}: {e}")
-                    results.append(("failed", link, str(e)))
-
-        # 总结
-        downloaded = [r for r in results if r[0] == "downloaded"]
-        skipped = [r for r in results if r[0] == "skipped"]
-        failed = [r for r in results if r[0] == "failed"]
-        logger.info("==== Done ====")
-        logger.info(f"Downloaded: {len(downloaded)}  Skipped: {len(skipped)}  Failed: {len(failed)}")
-        if failed:
-            logger.info("Failed items:")
-            for f in failed:
-                logger.info(f" - {f[1]}  ({f[2]})")
-    finally:
-        session.close()
+    # 总结
+    downloaded = [r for r in results if r[0] == "downloaded"]
+    skipped = [r for r in results if r[0] == "skipped"]
+    failed = [r for r in results if r[0] == "failed"]
+    logger.info("==== Done ====")
+    logger.info(f"Downloaded: {len(downloaded)}  Skipped: {len(skipped)}  Failed: {len(failed)}")
+    if failed:
+        logger.info("Failed items:")
+        for f in failed:
+            logger.info(f" - {f[1]}  ({f[2]})")
 
 
 if __name__ == "__main__":
     main()
-    # python crawling.py --output ./downloads --concurrency 4 --delay 1.0 --url "https://networkrepository.com/bn.php"
+    # python crawling.py --output ./downloads --concurrency 8 --delay 0.5 --url "https://networkrepository.com/bn.php" "https://networkrepository.com/bio.php"
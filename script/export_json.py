@@ -0,0 +1,28 @@
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utilize.store import export_json, STORE_SUFFIX
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert .sir result stores back to one JSON per beta.")
+    parser.add_argument("paths", nargs="+", help=".sir files or folders containing them (searched recursively)")
+    parser.add_argument("--output", type=str, default=None, help="Output folder (default: next to each store)")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        if os.path.isdir(path):
+            stores = [os.path.join(root, f) for root, _, files in os.walk(path) for f in files if f.endswith(STORE_SUFFIX)]
+        else:
+            stores = [path]
+        for store in stores:
+            export_json(store, args.output)
+            print(f"Exported: {store}")
+
+
+if __name__ == "__main__":
+    main()
+    # python script/export_json.py ./DataSet
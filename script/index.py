@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utilize.index import ResultIndex, index_folder
+from utilize.loader import load_config
+
+
+def main(argv=None):
+    base = load_config(os.path.join(ROOT, "config.yaml"))["base"]
+    parser = argparse.ArgumentParser(description="Build or update the SQLite index of all saved results (networks, runs, per-node scores).")
+    parser.add_argument("--dataset", type=str, default=base["save_path"], help="Results folder, one sub-folder per network")
+    parser.add_argument("--db", type=str, default=base["index_path"] or os.path.join(base["save_path"], "index.sqlite"), help="Index database")
+    parser.add_argument("--networks", type=str, default=base["networks_path"], help="Networks folder, used to fill in edges / critical beta of old results")
+    parser.add_argument("--rebuild", action="store_true", help="Drop the index and build it from scratch")
+    args = parser.parse_args(argv)
+
+    if args.rebuild:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+    start = time.perf_counter()
+    added = 0
+    with ResultIndex(args.db) as index:
+        for name in sorted(os.listdir(args.dataset)):
+            folder = os.path.join(args.dataset, name)
+            if os.path.isdir(folder):
+                added += index_folder(index, folder, args.networks)
+        networks, runs = index.db.execute("SELECT (SELECT count(*) FROM networks), (SELECT count(*) FROM runs)").fetchone()
+    print(f"Indexed {added} new runs in {time.perf_counter() - start:.1f}s; {networks} networks / {runs} runs in {args.db}")
+
+
+if __name__ == "__main__":
+    main()
+    # python script/index.py
+    # sqlite3 DataSet/index.sqlite "SELECT name, node, score FROM scores JOIN runs ON runs.id = run_id
+    #     JOIN networks ON networks.id = network_id WHERE name LIKE 'bio-%' AND multiplier = 2 AND rank <= 10"
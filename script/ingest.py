@@ -0,0 +1,54 @@
+import os
+import sys
+import argparse
+import multiprocessing as mp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utilize.ingest import ingest, ARCHIVE_SUFFIXES, EDGES_SUFFIX
+
+
+def find_inputs(paths):
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                found += [os.path.join(root, f) for f in files if f.endswith(ARCHIVE_SUFFIXES + (EDGES_SUFFIX,))]
+        else:
+            found.append(path)
+    return sorted(found)
+
+
+def _ingest(job):
+    path, output, delete = job
+    try:
+        written = ingest(path, output)
+    except Exception as e:
+        return path, None, e
+    if delete and written:
+        os.remove(path)
+    return path, written, None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read .edges files straight out of zip/tar archives into the CSR format running.py loads.")
+    parser.add_argument("paths", nargs="+", help="Archives, .edges files, or folders containing them (searched recursively)")
+    parser.add_argument("--output", type=str, default="./Networks", help="Networks folder to write into")
+    parser.add_argument("--workers", type=int, default=0, help="Archives processed in parallel (0 = all CPUs)")
+    parser.add_argument("--delete", action="store_true", help="Delete each archive after it was ingested")
+    args = parser.parse_args(argv)
+
+    jobs = [(path, args.output, args.delete) for path in find_inputs(args.paths)]
+    with mp.Pool(args.workers or mp.cpu_count()) as pool:
+        for path, written, error in pool.imap_unordered(_ingest, jobs):
+            if error is not None:
+                print(f"Failed: {path}: {error}")
+            elif not written:
+                print(f"Skipped (no .edges inside): {path}")
+            else:
+                print(f"Ingested: {path} -> {', '.join(written)}")
+
+
+if __name__ == "__main__":
+    main()
+    # python script/ingest.py ./Downloads --output ./Networks --delete
@@ -0,0 +1,186 @@
+import os
+import sys
+import queue
+import asyncio
+import argparse
+import threading
+import multiprocessing as mp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawling import Fetcher, logger
+from utilize.ingest import ingest, archive_stem, ARCHIVE_SUFFIXES, EDGES_SUFFIX
+
+
+# 三个阶段重叠执行：下载 (asyncio) -> 导入 (进程池) -> 模拟 (driver.run 的调度器)。
+# 两处有上限，积压不会撑满磁盘：
+#   已下载未导入的压缩包最多 max_archives 个 (下载前占位，导入完成后释放)
+#   已导入未模拟的网络最多 max_networks 个 (导入前占位，模拟完成后释放)
+
+
+def download_stage(pages, out_dir, max_archives, archives, fetcher_kwargs):
+    async def main():
+        slots = asyncio.Semaphore(max_archives)
+        loop = asyncio.get_running_loop()
+        release = lambda: loop.call_soon_threadsafe(slots.release)
+        fetcher = Fetcher(**fetcher_kwargs)
+
+        async def one(link):
+            # 下载中的也算占位；成功的压缩包把槽位交给导入阶段，导入完成后才释放
+            await slots.acquire()
+            status, url, path = await fetcher.download(link, out_dir)
+            if status == "failed":
+                logger.error(f"Download failed: {url} ({path})")
+                slots.release()
+            elif not path.endswith(ARCHIVE_SUFFIXES + (EDGES_SUFFIX,)):
+                logger.info(f"Not an archive, left as is: {path}")
+                slots.release()
+            else:
+                archives.put((path, release))
+
+        try:
+            links = await fetcher.crawl(pages)
+            await asyncio.gather(*(one(link) for link in links))
+            # 等所有槽位归还，即所有压缩包都已导入
+            for _ in range(max_archives):
+                await slots.acquire()
+        finally:
+            fetcher.close()
+
+    try:
+        asyncio.run(main())
+    finally:
+        archives.put(None)
+
+
+def ingest_stage(archives, networks, network_slots, ingest_pool, networks_path, delete, errors):
+    pending = []
+
+    def handle(path, release):
+        # 回调在进程池的结果线程里执行：异常只记录，两个槽位无论如何都要归还
+        def done(written):
+            queued = False
+            try:
+                if written:
+                    networks.put(archive_stem(path))
+                    queued = True
+                    logger.info(f"Ingested: {path}")
+                    if delete:
+                        os.remove(path)
+                else:
+                    logger.warning(f"No .edges inside: {path}")
+            except Exception as e:
+                logger.error(f"Ingest callback failed: {path} ({e})")
+                errors.append(e)
+            finally:
+                if not queued:
+                    network_slots.release()
+                release()
+
+        def failed(e):
+            try:
+                logger.error(f"Ingest failed: {path} ({e})")
+            finally:
+                network_slots.release()
+                release()
+
+        return done, failed
+
+    try:
+        while True:
+            item = archives.get()
+            if item is None:
+                break
+            path, release = item
+            network_slots.acquire()
+            done, failed = handle(path, release)
+            try:
+                pending.append(ingest_pool.apply_async(ingest, (path, networks_path), callback=done, error_callback=failed))
+            except Exception as e:
+                failed(e)
+        for result in pending:
+            result.wait()
+    finally:
+        networks.put(None)
+
+
+def simulate_stage(networks, jobs, network_slots, errors):
+    # 网络名 -> driver.Job；已经跑完的直接释放槽位。单个网络出错只记录并释放槽位，
+    # 否则导入阶段会一直等这个槽位
+    from utilize import driver
+
+    try:
+        while True:
+            name = networks.get()
+            if name is None:
+                break
+            try:
+                job = driver.make_job(name)
+            except Exception as e:
+                logger.error(f"Cannot schedule {name}: {e}")
+                errors.append(e)
+                job = None
+            if job is None:
+                network_slots.release()
+            else:
+                jobs.put(job)
+    finally:
+        jobs.put(None)
+
+
+def stage(target, errors):
+    # 阶段线程的入口：未处理的异常记进 errors，由 main 在模拟结束后重新抛出
+    def body(*args):
+        try:
+            target(*args)
+        except BaseException as e:
+            logger.error(f"{target.__name__} failed: {e}")
+            errors.append(e)
+
+    return body
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download, ingest and simulate networks with the three stages overlapped.")
+    parser.add_argument("--url", type=str, nargs="+", required=True, help="Listing page URL(s) to crawl")
+    parser.add_argument("--downloads", type=str, default="./downloads", help="Where archives are downloaded to")
+    parser.add_argument("--concurrency", type=int, default=8, help="Size of the download connection pool")
+    parser.add_argument("--delay", type=float, default=0.5, help="Minimum delay (s) between two requests to the same host")
+    parser.add_argument("--max-archives", type=int, default=4, help="Archives downloaded but not yet ingested")
+    parser.add_argument("--max-networks", type=int, default=8, help="Networks ingested but not yet simulated")
+    parser.add_argument("--ingest-workers", type=int, default=2, help="Processes parsing archives")
+    parser.add_argument("--keep", action="store_true", help="Keep archives after they were ingested")
+    args = parser.parse_args(argv)
+
+    # 驱动模块在这里才导入：模拟进程池的 worker 会重新执行本脚本的顶层
+    from utilize import driver
+
+    os.makedirs(args.downloads, exist_ok=True)
+    archives, networks, jobs = queue.Queue(), queue.Queue(), queue.Queue()
+    network_slots = threading.Semaphore(args.max_networks)
+    networks_path = driver.config["base"]["networks_path"]
+
+    # 两个进程池都在起线程之前 fork
+    errors = []
+    with mp.Pool(args.ingest_workers) as ingest_pool, \
+            driver.make_pool() as graph_pool:
+        stages = [
+            threading.Thread(target=stage(download_stage, errors), daemon=True,
+                             args=(args.url, args.downloads, args.max_archives, archives,
+                                   dict(connections=args.concurrency, delay=args.delay))),
+            threading.Thread(target=stage(ingest_stage, errors), daemon=True,
+                             args=(archives, networks, network_slots, ingest_pool, networks_path, not args.keep, errors)),
+            threading.Thread(target=stage(simulate_stage, errors), daemon=True,
+                             args=(networks, jobs, network_slots, errors)),
+        ]
+        for t in stages:
+            t.start()
+        driver.run(jobs, graph_pool=graph_pool, after=lambda job: network_slots.release())
+        for t in stages:
+            t.join()
+    if errors:
+        raise errors[0]
+
+if __name__ == "__main__":
+    main()
+    # python script/pipeline.py --url "https://networkrepository.com/bio.php" --max-archives 4 --max-networks 8
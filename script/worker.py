@@ -0,0 +1,46 @@
+import os
+import sys
+import argparse
+import multiprocessing as mp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utilize.cluster import work, is_tcp, resolve_authkey
+from utilize.loader import load_config
+from utilize.pool import worker_context
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lease simulation tasks from a running.py coordinator (cluster.address) and run them.")
+    parser.add_argument("address", nargs="?", default=None, help="Shared directory or host:port of the coordinator (default: cluster.address)")
+    parser.add_argument("--processes", type=int, default=0, help="Worker processes on this host (0 = all CPUs)")
+    parser.add_argument("--authkey", type=str, default=None, help="TCP authentication key (default: cluster.authkey, then $SIR_CLUSTER_AUTHKEY)")
+    parser.add_argument("--heartbeat", type=float, default=10.0, help="Seconds between lease renewals, must be below cluster.lease_timeout")
+    parser.add_argument("--max-graphs", type=int, default=4, help="Graphs each process keeps loaded")
+    args = parser.parse_args(argv)
+
+    config = load_config(os.path.join(ROOT, "config.yaml"))
+    cluster = config["cluster"]
+    address = args.address or cluster["address"]
+    if not address:
+        parser.error("no coordinator address given and cluster.address is empty")
+    kwargs = dict(authkey=args.authkey or cluster["authkey"], heartbeat_interval=args.heartbeat, max_graphs=args.max_graphs)
+    if is_tcp(address):
+        # 在启动各进程之前检查密钥
+        try:
+            resolve_authkey(kwargs["authkey"])
+        except ValueError as e:
+            parser.error(str(e))
+    ctx = worker_context(config["parallel"]["start_method"])
+    workers = [ctx.Process(target=work, args=(address,), kwargs=kwargs) for _ in range(args.processes or mp.cpu_count())]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+
+
+if __name__ == "__main__":
+    main()
+    # 协调者:  cluster.address 设为 "/mnt/shared/sir" 或 "0.0.0.0:5555" 后运行 python running.py
+    # 各主机:  python script/worker.py /mnt/shared/sir      或  python script/worker.py coordinator-host:5555
@@ -0,0 +1,60 @@
+import os
+import sys
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 与 script/ 下脚本的导入方式一致：仓库根目录与 script/ 都在 sys.path 上
+for path in (ROOT, os.path.join(ROOT, "script")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+class RangeHandler(SimpleHTTPRequestHandler):
+    # http.server 自带的处理器不认 Range 头，这里补上单段 Range (206)；
+    # server.ranged 为 False 时忽略 Range，整个文件按 200 返回
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        rng = self.headers.get("Range")
+        self.server.requests.append((self.path, rng))
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) or not os.path.isfile(path):
+            return super().do_GET()
+        with open(path, "rb") as f:
+            data = f.read()
+        if rng and self.server.ranged:
+            start, _, end = rng.partition("=")[2].partition("-")
+            start, end = int(start), min(int(end or len(data) - 1), len(data) - 1)
+            body = data[start:end + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        else:
+            body = data
+            self.send_response(200)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def http_server(tmp_path):
+    # 在线程里起一个服务 <tmp>/www 的 HTTP 服务器；server.url 是根地址，server.requests 记录 (路径, Range)
+    root = tmp_path / "www"
+    root.mkdir()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(RangeHandler, directory=str(root)))
+    server.root = root
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    server.ranged = True
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
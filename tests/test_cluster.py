@@ -0,0 +1,95 @@
+import time
+import socket
+import threading
+
+import networkx as nx
+import pytest
+
+from utilize import cluster
+from utilize.pool import GraphPool, worker_context
+from utilize.sir import SIR
+
+KEY = "test-secret-key"
+POOL = dict(node_batch=8, trial_chunk=10)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(params=["directory", "tcp"])
+def address(request, tmp_path, monkeypatch):
+    # 两种传输：共享目录与 127.0.0.1 上的 TCP，密钥从环境变量读
+    monkeypatch.setenv(cluster.AUTHKEY_ENV, KEY)
+    if request.param == "directory":
+        return str(tmp_path)
+    return f"127.0.0.1:{free_port()}"
+
+
+def simulate(pool):
+    return SIR(nx.karate_club_graph(), 0.2, 1, 40, engine="csr", seed=7, pool=pool)
+
+
+def start_workers(address, count=2):
+    # 与 script/worker.py 一样经 forkserver 启动：直接 fork 会继承协调者的监听套接字，
+    # 协调者关闭后 worker 的连接仍进了这个套接字的队列，握手永远等不到应答
+    ctx = worker_context("forkserver")
+    workers = [ctx.Process(target=cluster.work, args=(address,), kwargs=dict(heartbeat_interval=0.2, poll=0.05))
+               for _ in range(count)]
+    for p in workers:
+        p.start()
+    return workers
+
+
+def stop_workers(workers, pool):
+    # 交回过结果的 worker 在协调者关闭后自行退出；从没连上协调者的 TCP worker 会一直等，直接结束
+    busy = {int(name.rpartition(":")[2]) for name in pool.usage()["workers"]}
+    assert busy
+    pool.close()
+    for p in workers:
+        p.join(30 if p.pid in busy else 1)
+        if p.is_alive():
+            p.terminate()
+            p.join()
+    assert all(p.exitcode == 0 for p in workers if p.pid in busy)
+
+
+def test_matches_local(address):
+    # 两个本机 worker 进程执行的结果与单进程完全一致 (种子随任务下发)
+    with GraphPool(workers=1, **POOL) as pool:
+        expected = simulate(pool)
+    with GraphPool(cluster=dict(address=address, lease_timeout=30), **POOL) as pool:
+        workers = start_workers(address)
+        result = simulate(pool)
+        stop_workers(workers, pool)
+    assert result == expected
+
+
+def test_lease_expired(address):
+    # 一个 "worker" 领了任务就消失：租约 1 秒后到期，任务重新发放给其余 worker
+    with GraphPool(workers=1, **POOL) as pool:
+        expected = simulate(pool)
+    with GraphPool(cluster=dict(address=address, lease_timeout=1), **POOL) as pool:
+        client = cluster.SocketClient(address, None) if cluster.is_tcp(address) else cluster.DirectoryClient(address)
+        output = []
+        runner = threading.Thread(target=lambda: output.append(simulate(pool)), daemon=True)
+        runner.start()
+        while client.lease()[0] != "task":
+            time.sleep(0.01)
+        workers = start_workers(address)
+        runner.join(60)
+        assert not runner.is_alive(), "leased task was never re-issued"
+        stop_workers(workers, pool)
+    assert output == [expected]
+
+
+@pytest.mark.parametrize("authkey", [None, "", "sir-cluster"])
+def test_tcp_needs_secret(authkey, monkeypatch):
+    monkeypatch.delenv(cluster.AUTHKEY_ENV, raising=False)
+    address = f"127.0.0.1:{free_port()}"
+    with pytest.raises(ValueError):
+        GraphPool(cluster=dict(address=address, authkey=authkey))
+    with pytest.raises(ValueError):
+        cluster.SocketClient(address, authkey)
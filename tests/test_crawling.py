@@ -0,0 +1,110 @@
+import os
+import json
+import asyncio
+
+import pytest
+
+from crawling import Fetcher
+
+PART = 1000
+
+
+@pytest.fixture
+def payload(http_server):
+    data = os.urandom(10 * PART + 500)
+    (http_server.root / "net.zip").write_bytes(data)
+    return data
+
+
+def download(url, out_dir, **kwargs):
+    async def main():
+        fetcher = Fetcher(**dict(dict(connections=4, delay=0, timeout=10, part_size=PART), **kwargs))
+        try:
+            return await fetcher.download(url, str(out_dir))
+        finally:
+            fetcher.close()
+
+    return asyncio.run(main())
+
+
+def ranges(server):
+    return sorted(rng for path, rng in server.requests if path == "/net.zip")
+
+
+def test_ranged(http_server, payload, tmp_path):
+    status, _, path = download(f"{http_server.url}/net.zip", tmp_path)
+    assert status == "downloaded"
+    assert open(path, "rb").read() == payload
+    # 11 个分段各一个请求，首段兼作探测
+    assert len(ranges(http_server)) == 11
+    assert not os.path.exists(path + ".part") and not os.path.exists(path + ".part.json")
+
+
+def test_not_ranged(http_server, payload, tmp_path):
+    http_server.ranged = False
+    status, _, path = download(f"{http_server.url}/net.zip", tmp_path)
+    assert status == "downloaded"
+    assert open(path, "rb").read() == payload
+    assert len(ranges(http_server)) == 1
+
+
+def test_resumed(http_server, payload, tmp_path):
+    # 上次中断时写完了第 0、1、2 段，其余位置是预分配的空洞
+    part = tmp_path / "net.zip.part"
+    part.write_bytes(payload[:3 * PART] + bytes(len(payload) - 3 * PART))
+    (tmp_path / "net.zip.part.json").write_text(json.dumps({"total": len(payload), "parts": [0, 1, 2]}))
+    status, _, path = download(f"{http_server.url}/net.zip", tmp_path)
+    assert status == "downloaded"
+    assert open(path, "rb").read() == payload
+    assert ranges(http_server) == sorted(f"bytes={s}-{min(s + PART, len(payload)) - 1}"
+                                         for s in range(3 * PART, len(payload), PART))
+
+
+def test_interrupted(http_server, payload, tmp_path, monkeypatch):
+    # 第 5 段失败：.part 已预分配到完整大小，其余分段记在 .part.json 里，下次只补第 5 段
+    get = Fetcher._get
+
+    def flaky(self, url, tmp_path, start, *args):
+        if start == 5 * PART:
+            raise RuntimeError("connection reset")
+        return get(self, url, tmp_path, start, *args)
+
+    monkeypatch.setattr(Fetcher, "_get", flaky)
+    status, _, _ = download(f"{http_server.url}/net.zip", tmp_path, max_retries=1)
+    assert status == "failed"
+    assert os.path.getsize(tmp_path / "net.zip.part") == len(payload)
+    assert sorted(json.loads((tmp_path / "net.zip.part.json").read_text())["parts"]) == [p for p in range(11) if p != 5]
+
+    monkeypatch.setattr(Fetcher, "_get", get)
+    http_server.requests.clear()
+    status, _, path = download(f"{http_server.url}/net.zip", tmp_path)
+    assert status == "downloaded"
+    assert open(path, "rb").read() == payload
+    assert ranges(http_server) == [f"bytes={5 * PART}-{6 * PART - 1}"]
+
+
+def test_skip_existing(http_server, payload, tmp_path):
+    (tmp_path / "net.zip").write_bytes(payload)
+    status, _, path = download(f"{http_server.url}/net.zip", tmp_path)
+    assert status == "skipped"
+    assert not os.path.exists(path + ".part")
+
+
+def test_not_found(http_server, tmp_path):
+    status, _, error = download(f"{http_server.url}/missing.zip", tmp_path, max_retries=1)
+    assert status == "failed"
+    assert "404" in error
+    assert not os.path.exists(tmp_path / "missing.zip")
+
+
+def test_crawl(http_server):
+    (http_server.root / "list.html").write_text('<a href="a.zip">a</a> <a href="sub/b.tar.gz">b</a> <a href="c.html">c</a>')
+
+    async def main():
+        fetcher = Fetcher(delay=0, timeout=10)
+        try:
+            return await fetcher.crawl([f"{http_server.url}/list.html"])
+        finally:
+            fetcher.close()
+
+    assert asyncio.run(main()) == [f"{http_server.url}/a.zip", f"{http_server.url}/sub/b.tar.gz"]
@@ -0,0 +1,134 @@
+import io
+import os
+import sys
+import tarfile
+import threading
+import zipfile
+
+import numpy as np
+import pytest
+import yaml
+
+from conftest import ROOT
+
+
+def edges_text(n, seed):
+    # 环加随机弦的连通小图，首行是 networkrepository 风格的注释
+    rng = np.random.default_rng(seed)
+    edges = [(i, (i + 1) % n) for i in range(n)] + [tuple(rng.choice(n, 2, replace=False)) for _ in range(n)]
+    return "% sym unweighted\n" + "".join(f"{u + 1} {v + 1}\n" for u, v in edges)
+
+
+@pytest.fixture
+def served_archives(http_server):
+    # 列表页 + 一个 zip 与一个 tar.gz，各含一个 .edges 网络
+    root = http_server.root
+    with zipfile.ZipFile(root / "alpha.zip", "w") as z:
+        z.writestr("alpha.edges", edges_text(30, 1))
+    data = edges_text(40, 2).encode()
+    with tarfile.open(root / "gamma.tar.gz", "w:gz") as t:
+        info = tarfile.TarInfo("gamma/gamma.edges")
+        info.size = len(data)
+        t.addfile(info, io.BytesIO(data))
+    (root / "list.html").write_text('<a href="alpha.zip">alpha</a> <a href="gamma.tar.gz">gamma</a>')
+    return {"alpha": 30, "gamma": 40}
+
+
+def forget_driver():
+    # utilize.driver 在导入时读取当前目录的 config.yaml
+    import utilize
+
+    sys.modules.pop("utilize.driver", None)
+    utilize.__dict__.pop("driver", None)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # 以 tmp_path 为工作目录的小配置：少量试验、单进程模拟，所有输出都落在 tmp_path 下
+    with open(os.path.join(ROOT, "config.yaml"), "r") as f:
+        config = yaml.safe_load(f)
+    config["training"].update(beta=[1, 2], trials=20, seed=1)
+    config["parallel"].update(workers=1, trial_chunk=10)
+    config["scheduler"].update(max_networks=2)
+    config["metrics"]["path"] = "./metrics.jsonl"
+    (tmp_path / "config.yaml").write_text(yaml.safe_dump(config))
+    monkeypatch.chdir(tmp_path)
+    forget_driver()
+    yield tmp_path
+    forget_driver()
+
+
+def run_pipeline(url, timeout=120):
+    # 在线程里跑 pipeline.main，超时视为卡死；返回 main 抛出的异常 (没有则为 None)
+    import pipeline
+
+    argv = ["--url", url, "--downloads", "downloads", "--delay", "0", "--ingest-workers", "1",
+            "--max-archives", "1"]
+    raised = []
+
+    def target():
+        try:
+            pipeline.main(argv)
+        except Exception as e:
+            raised.append(e)
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "pipeline did not finish"
+    return raised[0] if raised else None
+
+
+def check_store(name, n):
+    from utilize.store import read_store, store_path
+
+    labels, matrix, columns = read_store(store_path(os.path.join("DataSet", name), name))
+    assert sorted(labels.tolist()) == list(range(1, n + 1))
+    means = [c for c in columns if c.get("field", "mean") == "mean"]
+    assert len(means) == 2
+    assert all(c["trials"] == 20 for c in means)
+    values = matrix[:, [c["offset"] for c in means]]
+    assert np.isfinite(values).all() and (values > 0).all()
+
+
+def test_pipeline(http_server, served_archives, workdir):
+    assert run_pipeline(f"{http_server.url}/list.html") is None
+    for name, n in served_archives.items():
+        check_store(name, n)
+    # 导入后的压缩包默认删除
+    assert os.listdir("downloads") == []
+
+
+def test_make_job_fails(http_server, served_archives, workdir, monkeypatch):
+    # 一个网络排不上时其余网络照常跑完，错误在最后由 main 抛出
+    from utilize import driver
+
+    make_job = driver.make_job
+
+    def broken(name):
+        if name == "alpha":
+            raise RuntimeError("broken network")
+        return make_job(name)
+
+    monkeypatch.setattr(driver, "make_job", broken)
+    error = run_pipeline(f"{http_server.url}/list.html")
+    assert isinstance(error, RuntimeError) and str(error) == "broken network"
+    check_store("gamma", served_archives["gamma"])
+    assert not os.path.exists(os.path.join("DataSet", "alpha"))
+
+
+def test_ingest_callback_fails(http_server, served_archives, workdir, monkeypatch):
+    # 导入完成回调出错时两个槽位仍然归还，后面的压缩包照常导入
+    import pipeline
+
+    stem = pipeline.archive_stem
+
+    def broken(path):
+        if path.endswith("alpha.zip"):
+            raise OSError("disk gone")
+        return stem(path)
+
+    monkeypatch.setattr(pipeline, "archive_stem", broken)
+    error = run_pipeline(f"{http_server.url}/list.html")
+    assert isinstance(error, OSError)
+    check_store("gamma", served_archives["gamma"])
@@ -0,0 +1,29 @@
+import math
+
+import networkx as nx
+import pytest
+
+from utilize.loader import Graph
+from utilize.tool import beta_threshold
+
+
+@pytest.mark.parametrize("n", [1, 2, 5])
+def test_threshold_without_edges(n):
+    assert beta_threshold(nx.empty_graph(n)) == math.inf
+
+
+def test_threshold_self_loops_only(tmp_path):
+    # build_csr 去掉自环后节点仍在，只是孤立
+    path = tmp_path / "loops.txt"
+    path.write_text("1 1\n2 2\n3 3\n")
+    G = Graph(str(path))
+    assert G.number_of_nodes() == 3 and G.number_of_edges() == 0
+    assert beta_threshold(G, str(path)) == math.inf
+    # 第二次从缓存读回
+    assert beta_threshold(G, str(path)) == math.inf
+
+
+def test_threshold_cycle():
+    # 环的最大特征值是 2
+    assert beta_threshold(nx.cycle_graph(10)) == pytest.approx(0.5)
+    assert beta_threshold(nx.DiGraph(nx.cycle_graph(10))) == pytest.approx(0.5)
@@ -0,0 +1,127 @@
+import os
+import json
+import hashlib
+import threading
+
+import numpy as np
+
+from utilize.kernel import ENGINE_VERSION
+
+
+def graph_key(G):
+    # 规范化边集的哈希：节点按原始编号排序后重编号 (loader 已完成)、去自环与重边，
+    # 因此同一边集换了目录名、行顺序、重复行或保序重编号 (如 0 起/1 起) 都得到同一个键
+    if not hasattr(G, "indptr"):
+        from utilize.loader import build_csr
+
+        edges = np.array(list(G.edges()), dtype=np.int64).reshape(-1, 2)
+        _, indptr, indices = build_csr(edges)
+    else:
+        indptr, indices = G.indptr, G.indices
+    h = hashlib.sha1()
+    h.update(np.int64(indptr.size - 1).tobytes())
+    h.update(np.ascontiguousarray(indptr, dtype=np.int32))
+    h.update(np.ascontiguousarray(indices, dtype=np.int32))
+    return h.hexdigest()
+
+
+def params_key(beta, params):
+    # beta 由各网络文件各自算出的阈值乘倍数得到，重复网络之间可能差在末几位，取 12 位有效数字再入键
+    raw = json.dumps(dict(params, beta=float(f"{beta:.12g}"), version=ENGINE_VERSION), sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+class ResultCache:
+    # 按 (图哈希, 模拟参数) 寻址的结果缓存；每格一个 .npz，按最近访问时间淘汰到 max_bytes 以内。
+    # 总大小只在打开时扫描一次，之后随写入累加；超过上限才扫描淘汰，并多腾出 10%，避免每次写入都遍历
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self.size = sum(size for _, size, _ in self.entries())
+
+    def file(self, key, beta, params):
+        return os.path.join(self.path, key[:2], f"{key}_{params_key(beta, params)}.npz")
+
+    def get(self, key, nodes, beta, params, arrays=False):
+        # 命中时返回 (排名字典, 详情)，节点编号换成当前网络自己的；arrays=True 时返回与 nodes 对齐的数组
+        from utilize.sir import ranking
+
+        path = self.file(key, beta, params)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as z:
+            mean, trials, info = z["mean"], z["trials"], json.loads(str(z["info"]))
+            curves = {k[len("curve_"):]: z[k] for k in z.files if k.startswith("curve_")}
+        if mean.size != len(nodes):
+            return None
+        os.utime(path)
+        if arrays:
+            if "top_k" in info:
+                info["top_k"] = np.asarray(nodes)[info["top_k"]].tolist()
+            return mean, dict(info, trials=trials, **({"curves": curves} if curves else {}))
+        details = dict(info, trials=dict(zip(nodes, trials.tolist())))
+        if curves:
+            details["curves"] = {k: dict(zip(nodes, v)) for k, v in curves.items()}
+        if "top_k" in info:
+            details["top_k"] = [nodes[i] for i in info["top_k"]]
+        return ranking(nodes, mean), details
+
+    def put(self, key, nodes, beta, params, output):
+        results, details = output
+        info = {k: v for k, v in details.items() if k not in ("trials", "curves")}
+        # 爆发曲线 (见 sir.summarize) 按 nodes 的顺序存成 curve_<字段> 数组
+        curves = details.get("curves", {})
+        if isinstance(results, dict):
+            index = {u: i for i, u in enumerate(nodes)}
+            mean = np.array([results[u] for u in nodes], dtype=np.float64)
+            trials = np.array([details["trials"][u] for u in nodes], dtype=np.int64)
+            curves = {k: np.array([v[u] for u in nodes]) for k, v in curves.items()}
+            if "top_k" in info:
+                info["top_k"] = [index[u] for u in info["top_k"]]
+        else:
+            mean, trials = np.asarray(results, dtype=np.float64), np.asarray(details["trials"], dtype=np.int64)
+            if "top_k" in info:
+                # 与字典模式一样存成 nodes 里的位置
+                nodes = np.asarray(nodes)
+                order = np.argsort(nodes)
+                info["top_k"] = order[np.searchsorted(nodes, info["top_k"], sorter=order)].tolist()
+
+        path = self.file(key, beta, params)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path[: -len(".npz")] + ".tmp.npz"
+        np.savez(tmp, mean=mean, trials=trials, info=json.dumps(info), **{"curve_" + k: v for k, v in curves.items()})
+        old = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp, path)
+        with self.lock:
+            self.size += os.path.getsize(path) - old
+            if self.size > self.max_bytes:
+                self.evict(int(self.max_bytes * 0.9))
+
+    def entries(self):
+        entries = []
+        for root, _, files in os.walk(self.path):
+            for f in files:
+                if f.endswith(".npz") and not f.endswith(".tmp.npz"):
+                    p = os.path.join(root, f)
+                    try:
+                        st = os.stat(p)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, p))
+        return entries
+
+    def evict(self, target):
+        # 按最近访问时间从旧到新删除，直到总大小不超过 target；顺便用实际扫描结果校正累计值
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(p)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.size = total
@@ -0,0 +1,49 @@
+import os
+import glob
+import json
+
+import numpy as np
+
+
+CHECKPOINT_SUFFIX = ".ckpt.npz"
+
+
+def checkpoint_path(target_folder, base_name):
+    return os.path.join(target_folder, base_name + CHECKPOINT_SUFFIX)
+
+
+def load_checkpoint(path, meta):
+    # meta 里 seed 为 None 时，沿用检查点里记录的种子，保证续跑结果与不中断时一致
+    if path is None or not os.path.exists(path):
+        return None
+    with np.load(path) as z:
+        saved = json.loads(str(z["meta"]))
+        if meta["seed"] is None:
+            meta = dict(meta, seed=saved["seed"])
+        if saved != meta:
+            return None
+        return {k: z[k] for k in z.files if k not in ("meta", "done")}, z["done"], saved["seed"]
+
+
+def save_checkpoint(path, meta, done, **accumulators):
+    tmp = path[: -len(".npz")] + ".tmp.npz"
+    with open(tmp, "wb") as f:
+        np.savez(f, meta=json.dumps(meta), done=done, **accumulators)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def scratch_path(target_folder, base_name):
+    # 大图模式下累加器内存映射文件的前缀：<前缀>.totals.npy / .squares.npy / .counts.npy (以及曲线累加器)
+    return os.path.join(target_folder, base_name + ".scratch")
+
+
+def clear_scratch(prefix):
+    for path in glob.glob(glob.escape(prefix) + ".*.npy"):
+        os.remove(path)
+
+
+def clear_checkpoint(path):
+    if path is not None and os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,387 @@
+import os
+import time
+import uuid
+import pickle
+import shutil
+import socket
+import itertools
+import threading
+from collections import deque, OrderedDict
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+
+import numpy as np
+
+from utilize.worker import forget, measured, _init
+
+
+# 多机执行：协调者把 GraphPool.run 生成的任务描述符 (网络, beta, 节点批, 试验块) 交给任意主机上的 worker，
+# worker 领取 (租约) 后执行并交回部分和。租约到期未续的任务重新发放，重复交回的结果只收第一份。
+# 种子随描述符下发，结果与任务在哪台机器上执行无关。两种传输：
+#   共享目录：worker 把 tasks/ 里的任务文件原子地改名到 leased/ 即为领取，文件 mtime 作心跳，结果写到 results/
+#   TCP (host:port)：multiprocessing.connection，authkey 做 HMAC 认证，每个请求一次短连接。
+#   两端都会反序列化对方发来的 pickle，知道密钥即可在对方机器上执行代码，所以密钥必须保密，不接受空值或旧的默认值
+
+
+INSECURE_AUTHKEYS = ("", "sir-cluster")
+AUTHKEY_ENV = "SIR_CLUSTER_AUTHKEY"
+
+
+def resolve_authkey(authkey):
+    # 未给出时读环境变量 SIR_CLUSTER_AUTHKEY；返回 bytes
+    authkey = authkey or os.environ.get(AUTHKEY_ENV, "")
+    if authkey in INSECURE_AUTHKEYS:
+        raise ValueError(f"TCP cluster mode needs a secret authkey: set cluster.authkey or {AUTHKEY_ENV} "
+                         f"(e.g. python -c 'import secrets; print(secrets.token_hex(32))')")
+    return authkey.encode("utf-8")
+
+
+def is_tcp(address):
+    host, _, port = address.rpartition(":")
+    return bool(host) and port.isdigit() and not os.path.isdir(address)
+
+
+def split_tcp(address):
+    host, _, port = address.rpartition(":")
+    return host, int(port)
+
+
+def write_atomic(path, obj):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+class DirectoryBackend:
+    # 协调者一侧的共享目录：graphs/<gid>/ (CSR .npy)、tasks/、leased/、results/，stop 文件通知 worker 退出
+    def __init__(self, root, lease_timeout):
+        self.root = root
+        self.lease_timeout = lease_timeout
+        # 目录只属于一个协调者，上次运行残留的任务和结果全部清掉
+        for sub in ("graphs", "tasks", "leased", "results"):
+            shutil.rmtree(os.path.join(root, sub), ignore_errors=True)
+            os.makedirs(os.path.join(root, sub))
+        if os.path.exists(os.path.join(root, "stop")):
+            os.remove(os.path.join(root, "stop"))
+
+    def publish(self, gid, indptr, indices):
+        tmp = os.path.join(self.root, "graphs", gid + ".tmp")
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, "indptr.npy"), indptr)
+        np.save(os.path.join(tmp, "indices.npy"), indices)
+        os.replace(tmp, os.path.join(self.root, "graphs", gid))
+
+    def release(self, gid):
+        shutil.rmtree(os.path.join(self.root, "graphs", gid), ignore_errors=True)
+        for sub in ("tasks", "leased"):
+            folder = os.path.join(self.root, sub)
+            for name in os.listdir(folder):
+                if name.startswith(gid + "-"):
+                    try:
+                        os.remove(os.path.join(folder, name))
+                    except FileNotFoundError:
+                        pass
+
+    def submit(self, tid, gid, task):
+        write_atomic(os.path.join(self.root, "tasks", tid + ".pkl"), (gid, task))
+
+    def collect(self):
+        results = []
+        folder = os.path.join(self.root, "results")
+        for name in os.listdir(folder):
+            if name.endswith(".pkl"):
+                path = os.path.join(folder, name)
+                with open(path, "rb") as f:
+                    results.append((name[:-len(".pkl")], pickle.load(f)))
+                os.remove(path)
+        # 心跳 (mtime) 超时的租约改名回 tasks/ 重新发放
+        now = time.time()
+        folder = os.path.join(self.root, "leased")
+        for name in os.listdir(folder):
+            path = os.path.join(folder, name)
+            try:
+                if now - os.stat(path).st_mtime > self.lease_timeout:
+                    os.rename(path, os.path.join(self.root, "tasks", name))
+            except FileNotFoundError:
+                pass
+        return results
+
+    def close(self):
+        open(os.path.join(self.root, "stop"), "w").close()
+
+
+class SocketBackend:
+    # 协调者一侧的 TCP 服务：任务表在内存里，监听线程为每个连接开一个线程应答
+    def __init__(self, address, lease_timeout, authkey):
+        self.lease_timeout = lease_timeout
+        self.lock = threading.Lock()
+        self.pending = deque()
+        self.tasks = {}
+        self.leases = {}
+        self.graphs = {}
+        self.results = []
+        self.closed = False
+        self.authkey = authkey
+        self.listener = Listener(split_tcp(address), authkey=authkey)
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except AuthenticationError:
+                continue
+            if self.closed:
+                conn.close()
+                self.listener.close()
+                return
+            threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    def handle(self, conn):
+        with conn:
+            try:
+                conn.send(self.answer(*conn.recv()))
+            except (EOFError, OSError):
+                pass
+
+    def answer(self, kind, *args):
+        with self.lock:
+            if self.closed:
+                return ("stop",)
+            if kind == "lease":
+                while self.pending:
+                    tid = self.pending.popleft()
+                    if tid in self.tasks:
+                        self.leases[tid] = time.monotonic() + self.lease_timeout
+                        return ("task", tid) + self.tasks[tid]
+                return ("wait",)
+            if kind == "renew":
+                if args[0] in self.leases:
+                    self.leases[args[0]] = time.monotonic() + self.lease_timeout
+                return ("ok",)
+            if kind == "graph":
+                return ("graph",) + self.graphs.get(args[0], (None, None))
+            if kind == "result":
+                tid, payload = args
+                if self.tasks.pop(tid, None) is not None:
+                    self.leases.pop(tid, None)
+                    self.results.append((tid, payload))
+                return ("ok",)
+        return ("error", f"unknown request: {kind}")
+
+    def publish(self, gid, indptr, indices):
+        with self.lock:
+            self.graphs[gid] = (np.asarray(indptr), np.asarray(indices))
+
+    def release(self, gid):
+        with self.lock:
+            self.graphs.pop(gid, None)
+            for tid in [t for t in self.tasks if t.startswith(gid + "-")]:
+                del self.tasks[tid]
+                self.leases.pop(tid, None)
+
+    def submit(self, tid, gid, task):
+        with self.lock:
+            self.tasks[tid] = (gid, task)
+            self.pending.append(tid)
+
+    def collect(self):
+        with self.lock:
+            now = time.monotonic()
+            for tid, deadline in list(self.leases.items()):
+                if deadline < now:
+                    del self.leases[tid]
+                    self.pending.appendleft(tid)
+            results, self.results = self.results, []
+        return results
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+        # 另一个线程里 close 监听套接字唤不醒阻塞的 accept，连自己一次让监听线程自行退出
+        host, port = self.listener.address
+        try:
+            Client(("127.0.0.1" if host in ("", "0.0.0.0") else host, port), authkey=self.authkey).close()
+        except OSError:
+            pass
+        self.thread.join()
+
+
+class Coordinator:
+    # GraphPool 的远程执行后端：publish 发布一张图，imap 提交一批任务并按完成顺序返回结果。
+    # 多个网络可在不同线程里同时 imap，结果按任务编号分发
+    def __init__(self, address, lease_timeout=120.0, authkey=None, poll=0.2):
+        if is_tcp(address):
+            self.backend = SocketBackend(address, lease_timeout, resolve_authkey(authkey))
+        else:
+            self.backend = DirectoryBackend(address, lease_timeout)
+        self.cond = threading.Condition()
+        self.waiting = set()
+        self.results = {}
+        self.count = itertools.count()
+        self.closed = False
+        self.thread = threading.Thread(target=self.collect, args=(poll,), daemon=True)
+        self.thread.start()
+
+    def collect(self, poll):
+        while not self.closed:
+            for tid, payload in self.backend.collect():
+                with self.cond:
+                    if tid in self.waiting:
+                        self.waiting.discard(tid)
+                        self.results[tid] = payload
+                        self.cond.notify_all()
+            time.sleep(poll)
+
+    def publish(self, indptr, indices):
+        gid = uuid.uuid4().hex[:12]
+        self.backend.publish(gid, indptr, indices)
+        return gid
+
+    def release(self, gid):
+        self.backend.release(gid)
+
+    def imap(self, gid, todo):
+        # todo: [(任务序号, 描述符)]；yield (任务序号, (结果, 统计))
+        tids = {}
+        for i, task in todo:
+            tid = f"{gid}-{next(self.count):09d}"
+            with self.cond:
+                self.waiting.add(tid)
+            tids[tid] = i
+            self.backend.submit(tid, gid, task)
+        while tids:
+            with self.cond:
+                self.cond.wait_for(lambda: any(t in self.results for t in tids))
+                ready = [(t, self.results.pop(t)) for t in list(tids) if t in self.results]
+            for tid, payload in ready:
+                yield tids.pop(tid), payload
+
+    def close(self):
+        self.closed = True
+        self.thread.join()
+        self.backend.close()
+
+
+class DirectoryClient:
+    # worker 一侧的共享目录访问
+    def __init__(self, root):
+        self.root = root
+
+    def lease(self):
+        if os.path.exists(os.path.join(self.root, "stop")):
+            return ("stop",)
+        folder = os.path.join(self.root, "tasks")
+        if not os.path.isdir(folder):
+            raise ConnectionRefusedError(f"no coordinator at {self.root}")
+        for name in sorted(os.listdir(folder)):
+            if not name.endswith(".pkl"):
+                continue
+            target = os.path.join(self.root, "leased", name)
+            try:
+                os.rename(os.path.join(folder, name), target)
+                os.utime(target)
+                with open(target, "rb") as f:
+                    gid, task = pickle.load(f)
+            except FileNotFoundError:
+                # 被别的 worker 抢先领取，或图已释放
+                continue
+            return ("task", name[:-len(".pkl")], gid, task)
+        return ("wait",)
+
+    def renew(self, tid):
+        try:
+            os.utime(os.path.join(self.root, "leased", tid + ".pkl"))
+        except FileNotFoundError:
+            pass
+
+    def graph(self, gid):
+        folder = os.path.join(self.root, "graphs", gid)
+        if not os.path.isdir(folder):
+            return None, None
+        return (np.load(os.path.join(folder, "indptr.npy"), mmap_mode="r"),
+                np.load(os.path.join(folder, "indices.npy"), mmap_mode="r"))
+
+    def result(self, tid, payload):
+        write_atomic(os.path.join(self.root, "results", tid + ".pkl"), payload)
+        try:
+            os.remove(os.path.join(self.root, "leased", tid + ".pkl"))
+        except FileNotFoundError:
+            pass
+
+
+class SocketClient:
+    # worker 一侧的 TCP 访问，每个请求一次短连接
+    def __init__(self, address, authkey):
+        self.address = split_tcp(address)
+        self.authkey = resolve_authkey(authkey)
+
+    def request(self, *msg):
+        with Client(self.address, authkey=self.authkey) as conn:
+            conn.send(msg)
+            return conn.recv()
+
+    def lease(self):
+        return self.request("lease")
+
+    def renew(self, tid):
+        self.request("renew", tid)
+
+    def graph(self, gid):
+        return self.request("graph", gid)[1:]
+
+    def result(self, tid, payload):
+        self.request("result", tid, payload)
+
+
+def heartbeat(client, tid, interval, stop):
+    while not stop.wait(interval):
+        try:
+            client.renew(tid)
+        except OSError:
+            pass
+
+
+def work(address, authkey=None, heartbeat_interval=10.0, poll=0.5, max_graphs=4):
+    # 一个 worker 进程：反复领取任务、执行、交回，直到协调者通知停止 (或连上过之后协调者消失)
+    client = SocketClient(address, authkey) if is_tcp(address) else DirectoryClient(address)
+    host = socket.gethostname()
+    _init(None)
+    graphs = OrderedDict()
+    connected = False
+    while True:
+        try:
+            reply = client.lease()
+        except (OSError, EOFError):
+            if connected:
+                return
+            time.sleep(poll)
+            continue
+        connected = True
+        if reply[0] == "stop":
+            return
+        if reply[0] != "task":
+            time.sleep(poll)
+            continue
+        _, tid, gid, task = reply
+        if gid not in graphs:
+            indptr, indices = client.graph(gid)
+            if indptr is None:
+                continue
+            graphs[gid] = (indptr, indices)
+            while len(graphs) > max_graphs:
+                forget(("remote", graphs.popitem(last=False)[0]))
+        graphs.move_to_end(gid)
+
+        stop = threading.Event()
+        beat = threading.Thread(target=heartbeat, args=(client, tid, heartbeat_interval, stop), daemon=True)
+        beat.start()
+        try:
+            result, stats = measured(("remote", gid), *graphs[gid], task)
+        finally:
+            stop.set()
+            beat.join()
+        # 统计按 "主机:pid" 区分 worker
+        client.result(tid, (result, (f"{host}:{stats[0]}",) + stats[1:]))
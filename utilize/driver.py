@@ -0,0 +1,196 @@
+import os
+from tqdm import tqdm
+
+
+from utilize.sir import SIR, SIR_sweep, SIR_topk, resolve_engine, ranking
+from utilize.pool import GraphPool
+from utilize.loader import Graph, load_config, load_betas, graph_size
+from utilize.scheduler import Job, schedule, network_cost, network_memory, memory_limit
+from utilize.tool import name_to_path, beta_threshold, CSR_SUFFIX
+from utilize.save import save_json, save_store, save_networks, create_folder
+from utilize.store import stored_betas, store_path
+from utilize.checkpoint import checkpoint_path, clear_checkpoint, scratch_path, clear_scratch
+from utilize.cache import ResultCache, graph_key
+from utilize.index import ResultIndex
+from utilize.metrics import Metrics, summary, worker_report
+
+
+config = load_config("./config.yaml")
+training = config["training"]
+# 爆发曲线只在完整排名 (非 top_k) 时记录
+curves = (config["curves"]["steps"], config["curves"]["bins"]) if config["curves"]["steps"] and training["top_k"] is None else None
+
+
+def save(target_folder, output, base_name, beta, engine, labels=None, **network):
+    # labels 不为 None 时 (大图模式) 结果是与之对齐的数组；network 是边数与临界 beta，一并记进列元数据和索引
+    results, details = output
+    meta = dict(gamma=training["gamma"], trials=training["trials"], seed=training["seed"], engine=engine,
+                tolerance=training["tolerance"], confidence=training["confidence"], saved=details.get("saved", 0), **network)
+    if training["top_k"] is not None:
+        meta.update(top_k=training["top_k"], budget=training["budget"], topk_confidence=details["confidence"])
+    if training["tolerance"] is not None or training["top_k"] is not None:
+        save_store(target_folder, details["trials"], base_name, beta, "trials", labels, **meta)
+    # 爆发曲线每个字段一列 (每个节点 steps 或 bins 个值)；列元数据只记最少的参数，结果库的元数据区是定长的
+    for field, values in details.get("curves", {}).items():
+        save_store(target_folder, values, base_name, beta, field, labels, gamma=training["gamma"], engine=engine,
+                   steps=config["curves"]["steps"], bins=config["curves"]["bins"])
+    save_store(target_folder, results, base_name, beta, labels=labels, **meta)
+    if config["base"]["export_json"]:
+        save_json(target_folder, results if labels is None else ranking(labels.tolist(), results), base_name, beta)
+    if index is not None:
+        nodes, values = (list(results), list(results.values())) if labels is None else (labels, results)
+        index.add(base_name, nodes, values, beta, meta, network.get("edges"), network.get("critical"))
+
+
+def sweeping():
+    # gamma == 1 时一次渗流扫描算出全部 beta (爆发曲线与 top_k 模式除外)
+    return training["top_k"] is None and training["sweep"] and training["gamma"] == 1 and curves is None
+
+
+def sim_params(engine):
+    keys = ("gamma", "trials", "seed", "tolerance", "confidence", "top_k", "budget", "symmetry")
+    return dict({k: training[k] for k in keys}, engine=engine, curves=curves)
+
+
+def run_network(job):
+    network_name, network_path = job.name, job.path
+
+    with metrics.stage(network_name, "load") as m:
+        G = Graph(network_path)
+        m.update(nodes=G.number_of_nodes(), edges=G.number_of_edges())
+
+    with metrics.stage(network_name, "threshold"):
+        betas = load_betas(G, config, network_path)
+        # 阈值已按文件哈希缓存，这里只是读回来
+        network = dict(edges=G.number_of_edges(), critical=beta_threshold(G, network_path))
+
+    target_folder, base_name = create_folder(config["base"]["save_path"], network_path)
+
+    # 已写入结果库的 beta 直接跳过；缓存里有的 (重复网络、之前算过的 beta) 直接取出；
+    # 其余从检查点续跑
+    finished = stored_betas(store_path(target_folder, base_name))
+    todo = [beta for beta in betas if beta not in finished]
+    ckpt = checkpoint_path(target_folder, base_name)
+    sweep_mode = sweeping()
+    engine = "percolation" if sweep_mode else resolve_engine(training["engine"], training["gamma"], curves is not None)
+    # 大图模式：节点编号与结果都保持为数组，累加器放在磁盘上的内存映射里
+    large = G.number_of_nodes() >= config["large_graph"]["min_nodes"]
+    labels = G.labels if large else None
+    scratch = scratch_path(target_folder, base_name) if large else None
+    nodes = G.labels if large else G.nodes()
+    key = graph_key(G) if cache is not None else None
+
+    saved = 0
+
+    def finish(beta, output):
+        nonlocal saved
+        saved += output[1].get("saved", 0)
+        with metrics.stage(network_name, "save", beta=beta):
+            if cache is not None:
+                cache.put(key, nodes, beta, sim_params(engine), output)
+            save(target_folder, output, base_name, beta, engine, labels, **network)
+        bar.set_postfix_str(summary(pool.usage()))
+
+    if cache is not None:
+        missing = []
+        for beta in todo:
+            hit = cache.get(key, nodes, beta, sim_params(engine), arrays=large)
+            if hit is None:
+                missing.append(beta)
+            else:
+                with metrics.stage(network_name, "save", beta=beta, cached=True):
+                    save(target_folder, hit, base_name, beta, engine, labels, **network)
+        todo = missing
+
+    if training["top_k"] is not None:
+        for beta in tqdm(todo, desc=f"Betas for {network_name}", leave=False, unit="β"):
+            with metrics.stage(network_name, "simulate", beta=beta, engine=engine):
+                output = SIR_topk(G, beta, training["gamma"], training["top_k"], training["budget"], engine, training["seed"],
+                                  pool=pool, confidence=training["confidence"], symmetry=training["symmetry"], arrays=large)
+            finish(beta, output)
+    elif sweep_mode and todo:
+        with metrics.stage(network_name, "simulate", beta=todo, engine=engine):
+            sweep = SIR_sweep(G, todo, training["gamma"], training["trials"], training["seed"], pool=pool, checkpoint=ckpt,
+                              tol=training["tolerance"], confidence=training["confidence"], details=True, arrays=large,
+                              scratch=scratch)
+        for beta, output in zip(todo, sweep):
+            finish(beta, output)
+        clear_checkpoint(ckpt)
+    else:
+        for beta in tqdm(todo, desc=f"Betas for {network_name}", leave=False, unit="β"):
+            with metrics.stage(network_name, "simulate", beta=beta, engine=engine):
+                output = SIR(G, beta, training["gamma"], training["trials"], engine, training["seed"], pool=pool, checkpoint=ckpt,
+                             tol=training["tolerance"], confidence=training["confidence"], details=True, symmetry=training["symmetry"],
+                             arrays=large, scratch=scratch, curves=curves)
+            finish(beta, output)
+            clear_checkpoint(ckpt)
+
+    if saved:
+        tqdm.write(f"{network_name}: structural twins saved {saved} simulations")
+    if scratch is not None:
+        clear_scratch(scratch)
+    pool.release(G)
+    save_networks(network_path, target_folder)
+    # 每跑完一个网络记一次进程池的累计吞吐、空闲与各 worker 的峰值内存
+    metrics.write(dict(pool.usage(), network=network_name, stage="pool"))
+
+
+# 结果缓存与索引在 run() 里打开：导入本模块 (如 spawn 启动的子进程重新导入主模块) 不应有副作用
+cache = None
+index = None
+
+
+def make_job(network_name):
+    # 已经跑完 (DataSet 里有网络文件) 的返回 None
+    done = os.path.join(config["base"]["save_path"], network_name, f"{network_name}.txt")
+    if os.path.exists(done) or os.path.exists(done + CSR_SUFFIX):
+        return None
+    network_path = name_to_path(network_name, config["base"]["networks_path"])
+    N, E = graph_size(network_path)
+    cost = network_cost(N, E, len(training["beta"]), training["trials"], training["gamma"], training["sweep"])
+    memory = network_memory(N, E, config["parallel"]["workers"] or os.cpu_count(), training["gamma"],
+                            config["parallel"]["task_memory_mb"] << 20, len(training["beta"]) if sweeping() else 1)
+    return Job(network_name, network_path, N, E, cost, memory)
+
+
+def make_pool():
+    # cluster.address 为空时用本机进程池，否则任务交给各主机上的 script/worker.py
+    cluster = config["cluster"]
+    return GraphPool(**config["parallel"], profile=config["metrics"]["profile"],
+                     cluster=dict(address=cluster["address"], lease_timeout=cluster["lease_timeout"],
+                                  authkey=cluster["authkey"]) if cluster["address"] else None)
+
+
+def run(jobs, total=None, graph_pool=None, after=None, startup=None):
+    # jobs 可以是列表，也可以是 queue.Queue (以 None 结束，边到达边调度)；
+    # graph_pool 为 None 时自己建进程池；after(job) 在每个网络跑完后调用；
+    # startup 是入口 (cli.py) 测得的启动开销，记进 metrics
+    global pool, metrics, bar, cache, index
+    if cache is None and config["base"]["cache_path"]:
+        cache = ResultCache(config["base"]["cache_path"], int(config["base"]["cache_size_gb"] * (1 << 30)))
+    if index is None and config["base"]["index_path"]:
+        index = ResultIndex(config["base"]["index_path"])
+    with graph_pool or make_pool() as pool, \
+            Metrics(config["metrics"]["path"]) as metrics:
+        if startup is not None:
+            metrics.write(dict(startup, stage="startup"))
+        limit = memory_limit(config["scheduler"]["memory_limit_gb"])
+        with tqdm(total=total, desc="Networks", unit="net") as bar:
+            for job, future in schedule(jobs, run_network, config["scheduler"]["max_networks"], limit):
+                future.result()
+                bar.set_postfix_str(summary(pool.usage()))
+                bar.update()
+                if after is not None:
+                    after(job)
+        tqdm.write(worker_report(pool.usage()))
+
+
+def main(startup=None):
+    base_path = config["base"]["networks_path"]
+    networks = [
+        name for name in os.listdir(base_path)
+        if os.path.isdir(os.path.join(base_path, name))
+    ]
+    jobs = [job for job in map(make_job, networks) if job is not None]
+    run(jobs, len(jobs), startup=startup)
+
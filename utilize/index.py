@@ -0,0 +1,150 @@
+import os
+import json
+import sqlite3
+import threading
+import itertools
+
+import numpy as np
+
+from utilize.store import read_store, column_values, STORE_SUFFIX
+from utilize.tool import THRESHOLD_SUFFIX
+
+
+# 全部网络结果的 SQLite 索引，跨网络的查询不用再逐个打开结果文件：
+#   networks  每个网络一行 (节点数, 边数, 临界 beta)
+#   runs      每个网络每个 beta 一行；multiplier = beta / 临界 beta，便于按 "几倍阈值" 跨网络对齐
+#   scores    每个 run 每个节点一行 (得分 = 平均爆发规模, 名次从 1 开始，得分相同按节点编号)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS networks (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    nodes INTEGER,
+    edges INTEGER,
+    critical REAL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    network_id INTEGER NOT NULL REFERENCES networks(id),
+    beta REAL NOT NULL,
+    multiplier REAL,
+    gamma REAL,
+    trials INTEGER,
+    engine TEXT,
+    meta TEXT,
+    UNIQUE (network_id, beta)
+);
+CREATE TABLE IF NOT EXISTS scores (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    node INTEGER NOT NULL,
+    score REAL NOT NULL,
+    rank INTEGER NOT NULL,
+    PRIMARY KEY (run_id, node)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS runs_beta ON runs (beta);
+CREATE INDEX IF NOT EXISTS runs_multiplier ON runs (multiplier);
+CREATE UNIQUE INDEX IF NOT EXISTS scores_rank ON scores (run_id, rank);
+"""
+
+
+class ResultIndex:
+    # 一个连接加一把锁，多个网络的驱动线程可以同时写
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def network(self, name, nodes=None, edges=None, critical=None):
+        # 插入或补全一个网络，已有的值不会被 None 覆盖；返回 id
+        self.db.execute(
+            "INSERT INTO networks (name, nodes, edges, critical) VALUES (?, ?, ?, ?) ON CONFLICT (name) DO UPDATE SET "
+            "nodes = coalesce(excluded.nodes, nodes), edges = coalesce(excluded.edges, edges), "
+            "critical = coalesce(excluded.critical, critical)", (name, nodes, edges, critical))
+        return self.db.execute("SELECT id FROM networks WHERE name = ?", (name,)).fetchone()[0]
+
+    def betas(self, name):
+        rows = self.db.execute("SELECT beta FROM runs JOIN networks ON networks.id = runs.network_id WHERE name = ?", (name,))
+        return {beta for beta, in rows}
+
+    def add(self, name, nodes, scores, beta, meta=None, edges=None, critical=None):
+        # 写入一个网络一个 beta 的结果；同一 beta 已有结果时整体替换
+        meta = dict(meta or {})
+        nodes = np.asarray(nodes, dtype=np.int64)
+        # 与 .sir 结果库同为 float32 精度，增量写入与从结果库重建得到完全相同的得分和名次
+        scores = np.asarray(scores, dtype=np.float32).astype(np.float64)
+        rank = np.empty(nodes.size, dtype=np.int64)
+        rank[np.lexsort((nodes, -scores))] = np.arange(1, nodes.size + 1)
+        with self.lock, self.db:
+            network_id = self.network(name, int(nodes.size), edges, critical)
+            critical, = self.db.execute("SELECT critical FROM networks WHERE id = ?", (network_id,)).fetchone()
+            old = self.db.execute("SELECT id FROM runs WHERE network_id = ? AND beta = ?", (network_id, float(beta))).fetchone()
+            if old is not None:
+                self.db.execute("DELETE FROM scores WHERE run_id = ?", old)
+                self.db.execute("DELETE FROM runs WHERE id = ?", old)
+            run_id = self.db.execute(
+                "INSERT INTO runs (network_id, beta, multiplier, gamma, trials, engine, meta) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (network_id, float(beta), round(beta / critical, 6) if critical else None, meta.get("gamma"),
+                 meta.get("trials"), meta.get("engine"), json.dumps(meta))).lastrowid
+            self.db.executemany("INSERT INTO scores (run_id, node, score, rank) VALUES (?, ?, ?, ?)",
+                                zip(itertools.repeat(run_id), nodes.tolist(), scores.tolist(), rank.tolist()))
+
+
+def cached_info(networks_path, name):
+    # 老结果的列元数据里没有边数与临界 beta 时，从 Networks/ 里的 CSR 与阈值缓存补上
+    from utilize.loader import cached_meta
+    from utilize.tool import name_to_path
+
+    folder = os.path.join(networks_path, name) if networks_path else None
+    if folder is None or not os.path.isdir(folder):
+        return None, None
+    path = name_to_path(name, networks_path)
+    meta = cached_meta(path) or {}
+    critical = None
+    if os.path.exists(path + THRESHOLD_SUFFIX):
+        with open(path + THRESHOLD_SUFFIX, "r", encoding="utf-8") as f:
+            critical = json.load(f)["threshold"]
+    return meta.get("edges"), critical
+
+
+def index_folder(index, folder, networks_path=None):
+    # 把 DataSet/<网络>/ 里已保存的结果补进索引：优先读 .sir 结果库，没有时读 <网络>_<beta>.json；
+    # 已索引的 beta 跳过。返回新增的 run 数
+    name = os.path.basename(os.path.normpath(folder))
+    done = index.betas(name)
+    edges, critical = cached_info(networks_path, name)
+    added = 0
+    store = os.path.join(folder, name + STORE_SUFFIX)
+    if os.path.exists(store):
+        nodes, matrix, columns = read_store(store)
+        for column in columns:
+            if column.get("field", "mean") != "mean" or column["beta"] in done:
+                continue
+            meta = {k: v for k, v in column.items() if k not in ("beta", "field", "offset")}
+            index.add(name, nodes, column_values(matrix, column), column["beta"], meta,
+                      meta.get("edges", edges), meta.get("critical", critical))
+            added += 1
+        return added
+    for f in sorted(os.listdir(folder)):
+        if not (f.startswith(name + "_") and f.endswith(".json")):
+            continue
+        try:
+            beta = float(f[len(name) + 1: -len(".json")])
+        except ValueError:
+            continue
+        if beta in done:
+            continue
+        with open(os.path.join(folder, f), "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        index.add(name, [int(u) for u in data], list(data.values()), beta, edges=edges, critical=critical)
+        added += 1
+    return added
@@ -0,0 +1,103 @@
+import io
+import os
+import hashlib
+import tarfile
+import zipfile
+import warnings
+
+import numpy as np
+
+from utilize.loader import build_csr, cached_meta, write_csr
+
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2")
+EDGES_SUFFIX = ".edges"
+CHUNK_BYTES = 1 << 24
+# 逗号和制表符都当作空白分隔
+_SEPARATORS = bytes.maketrans(b",\t", b"  ")
+
+
+def archive_stem(path):
+    name = os.path.basename(path)
+    for suffix in sorted(ARCHIVE_SUFFIXES, key=len, reverse=True):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return os.path.splitext(name)[0]
+
+
+def parse_chunk(block):
+    # 一块完整行的前两列 -> (k, 2) int64；% 和 # 开头的是注释行
+    block = block.translate(_SEPARATORS)
+    try:
+        with warnings.catch_warnings():
+            # 只有注释行的块会触发 "input contained no data"
+            warnings.simplefilter("ignore", UserWarning)
+            return np.loadtxt(io.BytesIO(block), dtype=np.int64, usecols=(0, 1), comments=("%", "#"), ndmin=2)
+    except ValueError:
+        # 有不足两列的行时退回逐行解析
+        edges = []
+        for line in block.splitlines():
+            parts = line.split()
+            if len(parts) >= 2 and not parts[0].startswith((b"%", b"#")):
+                edges.append((int(parts[0]), int(parts[1])))
+        return np.array(edges, dtype=np.int64).reshape(-1, 2)
+
+
+def parse_stream(f, chunk=CHUNK_BYTES):
+    # 从文件流按块读取并解析，同时计算内容的 SHA-1 (与解压后 file_hash 的结果一致)
+    h = hashlib.sha1()
+    parts = []
+    rest = b""
+    for block in iter(lambda: f.read(chunk), b""):
+        h.update(block)
+        block = rest + block
+        cut = block.rfind(b"\n") + 1
+        rest = block[cut:]
+        if cut:
+            parts.append(parse_chunk(block[:cut]))
+    if rest.strip():
+        parts.append(parse_chunk(rest))
+    edges = np.concatenate(parts) if parts else np.zeros((0, 2), dtype=np.int64)
+    return edges, h.hexdigest()
+
+
+def edge_members(path):
+    # 逐个 yield (成员名, 文件流)；tar 按流式顺序读取，不需要随机访问
+    if path.endswith(EDGES_SUFFIX):
+        with open(path, "rb") as f:
+            yield os.path.basename(path), f
+    elif path.endswith(".zip"):
+        with zipfile.ZipFile(path) as z:
+            for info in z.infolist():
+                if not info.is_dir() and info.filename.endswith(EDGES_SUFFIX):
+                    with z.open(info) as f:
+                        yield info.filename, f
+    elif path.endswith(ARCHIVE_SUFFIXES):
+        with tarfile.open(path, "r|*") as tar:
+            for info in tar:
+                if info.isfile() and info.name.endswith(EDGES_SUFFIX):
+                    yield info.name, tar.extractfile(info)
+    else:
+        raise ValueError(f"unsupported file: {path}")
+
+
+def ingest(path, networks_path):
+    # 一个压缩包 (或单个 .edges 文件) -> <networks_path>/<包名>/<成员名>.txt.csr。
+    # 不解压到磁盘，也不写中间的 .txt；同名成员依次加 _1, _2, ...。返回写出的网络路径
+    folder = os.path.join(networks_path, archive_stem(path))
+    written = []
+    for name, f in edge_members(path):
+        base = os.path.basename(name)[: -len(EDGES_SUFFIX)]
+        target = os.path.join(folder, base + ".txt")
+        idx = 1
+        while target in written:
+            target = os.path.join(folder, f"{base}_{idx}.txt")
+            idx += 1
+        written.append(target)
+        if cached_meta(target) is not None:
+            continue
+        edges, sha1 = parse_stream(f)
+        labels, indptr, indices = build_csr(edges)
+        write_csr(target, labels, indptr, indices, {"size": None, "mtime_ns": None, "sha1": sha1,
+                                                    "source": f"{os.path.basename(path)}:{name}"})
+    return written
@@ -0,0 +1,348 @@
+import heapq
+
+import numpy as np
+
+
+# 模拟语义 (随机数消耗方式、更新规则) 改变时加一，使结果缓存失效
+ENGINE_VERSION = 2
+
+
+def compress(parent):
+    # 指针跳跃，直到每个节点都直接指向根
+    while True:
+        grand = parent[parent]
+        if np.array_equal(grand, parent):
+            return parent
+        parent = grand
+
+
+def index_dtype(n):
+    # 节点下标能放进 int32 时用 int32，大图上工作数组省一半内存
+    return np.int32 if n < 2 ** 31 else np.int64
+
+
+def union_find(n, src, dst, parent=None):
+    # 向量化并查集：每轮把较大的根挂到较小的根上，再做路径压缩
+    # parent 必须已压缩 (parent[x] 是根 且 parent[x] <= x)
+    parent = np.arange(n, dtype=index_dtype(n)) if parent is None else parent.copy()
+    while src.size:
+        a, b = parent[src], parent[dst]
+        keep = a != b
+        if not keep.any():
+            break
+        src, dst, a, b = src[keep], dst[keep], a[keep], b[keep]
+        np.minimum.at(parent, np.maximum(a, b), np.minimum(a, b))
+        parent = compress(parent)
+    return parent
+
+
+def component_sizes(labels):
+    return np.bincount(labels, minlength=labels.size)[labels]
+
+
+def percolation_sizes(n, src, dst, beta, trials, rng):
+    # gamma = 1 时 SIR 等价于概率为 beta 的键渗流：
+    # 每个源节点的爆发规模 = 其在渗流图中所在连通分量的大小
+    total = np.zeros(n, dtype=np.float64)
+    square = np.zeros(n, dtype=np.float64)
+    for _ in range(trials):
+        keep = rng.random(src.size) < beta
+        sizes = component_sizes(union_find(n, src[keep], dst[keep]))
+        total += sizes
+        square += sizes.astype(np.float64) ** 2
+    return total, square
+
+
+def beta_batch(n, n_betas, task_memory):
+    # 一个渗流任务同时扫描的 beta 数：每个 beta 两个 float64 的 (n,) 累加数组，合计不超过 task_memory 字节
+    return int(min(n_betas, max(1, task_memory // (16 * max(n, 1)))))
+
+
+def sweep_sizes(n, src, dst, betas, trials, rng):
+    # Newman–Ziff 扫描：每次试验给每条边一个随机权重 w (即随机加边顺序)，
+    # 边在 beta 下保留 <=> w < beta。按 beta 从小到大只合并新增的边，
+    # 一次试验即可得到所有 beta 下的分量大小
+    betas = np.asarray(betas, dtype=np.float64)
+    order = np.argsort(betas)
+    total = np.zeros((betas.size, n), dtype=np.float64)
+    square = np.zeros((betas.size, n), dtype=np.float64)
+    for _ in range(trials):
+        level = np.searchsorted(betas[order], rng.random(src.size), side="right")
+        idx = np.argsort(level, kind="stable")
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(level, minlength=betas.size + 1))))
+        s, d = src[idx], dst[idx]
+        parent = np.arange(n, dtype=index_dtype(n))
+        for k, j in enumerate(order):
+            parent = union_find(n, s[bounds[k]:bounds[k + 1]], d[bounds[k]:bounds[k + 1]], parent)
+            sizes = component_sizes(parent)
+            total[j] += sizes
+            square[j] += sizes.astype(np.float64) ** 2
+    return total, square
+
+
+S, I, R = 0, 1, 2
+
+
+def csr_from_edges(n, src, dst):
+    # 无向图 -> 对称 CSR 邻接 (int32 indptr / indices)
+    rows = np.concatenate((src, dst))
+    cols = np.concatenate((dst, src))
+    indptr = np.zeros(n + 1, dtype=np.int32)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    return indptr, cols[np.argsort(rows, kind="stable")].astype(np.int32)
+
+
+def neighbours(indptr, indices, nodes):
+    # 拼接一组节点的邻接表，返回 (在 nodes 中的下标, 邻居)
+    start = indptr[nodes].astype(np.int64)
+    deg = indptr[nodes + 1] - start
+    owner = np.repeat(np.arange(nodes.size), deg)
+    offset = np.arange(owner.size) - np.repeat(np.cumsum(deg) - deg, deg)
+    return owner, indices[start[owner] + offset]
+
+
+def _same_rows(indptr, indices, members, reps):
+    # 逐元素比较 members 与 reps 的 (已排序、等长) 邻接行，返回每对是否完全相同
+    deg = indptr[members + 1] - indptr[members]
+    pair = np.repeat(np.arange(members.size), deg)
+    offset = np.arange(pair.size) - np.repeat(np.cumsum(deg) - deg, deg)
+    diff = indices[indptr[members][pair] + offset] != indices[indptr[reps][pair] + offset]
+    return np.bincount(pair[diff], minlength=members.size) == 0
+
+
+def _group_rows(indptr, indices, seed):
+    # 邻接行完全相同的节点归为一类：先按 (度, 随机权重和) 分组，再与组内第一个节点逐元素核对，
+    # 哈希碰撞的节点自成一类，所以结果是精确的。返回每个节点所在类的代表
+    n = indptr.size - 1
+    deg = np.diff(indptr)
+    weight = np.random.default_rng(seed).integers(1, 1 << 62, size=n, dtype=np.uint64)
+    key = np.zeros(n, dtype=np.uint64)
+    np.add.at(key, np.repeat(np.arange(n), deg), weight[indices])
+    order = np.lexsort((key, deg))
+    head = np.ones(n, dtype=bool)
+    head[1:] = (deg[order][1:] != deg[order][:-1]) | (key[order][1:] != key[order][:-1])
+    rep = np.empty(n, dtype=np.int64)
+    rep[order] = order[np.flatnonzero(head)[np.cumsum(head) - 1]]
+    moved = np.flatnonzero(rep != np.arange(n))
+    bad = moved[~_same_rows(indptr, indices, moved, rep[moved])]
+    rep[bad] = bad
+    return rep
+
+
+def twin_classes(indptr, indices, seed=0):
+    # 结构孪生：开邻域 N(u) = N(v) (如挂在同一个中心上的叶子) 或闭邻域 N[u] = N[v] (相邻且其余邻居相同)。
+    # 交换一对孪生是图的自同构，它们作为源节点的期望爆发规模完全相同。
+    # 一个节点不会同时有非平凡的开孪生类和闭孪生类，两种关系合起来仍是等价关系。
+    # 返回 (每个节点的代表, 代表列表)，代表取类中编号最小的节点
+    n = indptr.size - 1
+    deg = np.diff(indptr)
+    owner = np.repeat(np.arange(n), deg)
+    order = np.lexsort((indices, owner))
+    open_ = indices[order]
+    # 闭邻域：每行加上自身后排序
+    rows = np.concatenate((owner, np.arange(n)))
+    cols = np.concatenate((indices, np.arange(n)))
+    order = np.lexsort((cols, rows))
+    closed_ptr = (indptr + np.arange(n + 1)).astype(np.int64)
+    closed = cols[order]
+
+    rep = _group_rows(indptr.astype(np.int64), open_, seed)
+    alt = _group_rows(closed_ptr, closed, seed + 1)
+    single = np.bincount(rep, minlength=n)[rep] == 1
+    rep[single] = alt[single]
+    # 代表改成类中编号最小的节点
+    low = np.full(n, n, dtype=np.int64)
+    np.minimum.at(low, rep, np.arange(n))
+    rep = low[rep]
+    return rep, np.unique(rep)
+
+
+def sir_batch(indptr, indices, seeds, beta, gamma, rng, steps=0):
+    # 一行一次试验，行 r 从 seeds[r] 出发；与 ndlib SIRModel 同步更新规则一致：
+    # 每步每个感染节点以 beta 尝试感染每个易感邻居，再以 gamma 恢复。
+    # steps > 0 时另外返回每行前 steps 步 (第 0 步为初始状态) 的 I(t)、R(t)，形状 (行, steps)
+    n = indptr.size - 1
+    rows = seeds.size
+    state = np.zeros((rows, n), dtype=np.uint8)
+    flat = state.reshape(-1)
+    t_inf = np.arange(rows)
+    u_inf = np.asarray(seeds, dtype=np.int64)
+    state[t_inf, u_inf] = I
+    if steps:
+        I_t = np.zeros((rows, steps), dtype=np.uint32)
+        R_t = np.zeros((rows, steps), dtype=np.uint32)
+        removed = np.zeros(rows, dtype=np.int64)
+    step = 0
+    while t_inf.size:
+        if step < steps:
+            I_t[:, step] = np.bincount(t_inf, minlength=rows)
+            R_t[:, step] = removed
+        step += 1
+        owner, v = neighbours(indptr, indices, u_inf)
+        t = t_inf[owner]
+        cell = t * n + v
+        cell = cell[flat[cell] == S]
+        new = np.unique(cell[rng.random(cell.size) < beta])
+
+        rec = rng.random(t_inf.size) < gamma
+        state[t_inf[rec], u_inf[rec]] = R
+        if steps:
+            removed += np.bincount(t_inf[rec], minlength=rows)
+        flat[new] = I
+        t_inf = np.concatenate((t_inf[~rec], new // n))
+        u_inf = np.concatenate((u_inf[~rec], new % n))
+    sizes = np.count_nonzero(state == R, axis=1)
+    if not steps:
+        return sizes
+    # 全部结束之后 I = 0，R 停在最终规模
+    R_t[:, step:] = sizes[:, None]
+    return sizes, I_t, R_t
+
+
+# 曲线累加器：I(t)、R(t) 的均值与离差平方和 (Welford)，以及最终规模直方图
+CURVE_KEYS = ("I_mean", "I_m2", "R_mean", "R_m2", "hist")
+
+
+def pad_curve(I_list, R_list, steps):
+    # 一次模拟逐步的 I、R 序列 -> 截断/补齐到 steps 步 (结束后 I = 0，R 停在最终规模)，另返回最终规模
+    final = R_list[-1]
+    I_t, R_t = np.zeros(steps), np.full(steps, float(final))
+    k = min(steps, len(I_list))
+    I_t[:k], R_t[:k] = I_list[:k], R_list[:k]
+    return I_t, R_t, final
+
+
+def curve_stats(owner, size, I_t, R_t, final, n, bins):
+    # 一批试验 (行属于 owner 指向的节点) -> 每个节点的 Welford 统计量：
+    # (I 均值, I 离差平方和, R 均值, R 离差平方和, 最终规模直方图)，bins 个等宽区间覆盖 [0, 1] 的爆发比例
+    count = np.bincount(owner, minlength=size).astype(np.float64)
+    c = np.maximum(count, 1)[:, None]
+    stats = []
+    for x in (I_t, R_t):
+        x = x.astype(np.float64)
+        mean = np.zeros((size, x.shape[1]))
+        np.add.at(mean, owner, x)
+        mean /= c
+        m2 = np.zeros_like(mean)
+        np.add.at(m2, owner, (x - mean[owner]) ** 2)
+        stats += [mean, m2]
+    hist = np.zeros((size, bins))
+    np.add.at(hist, (owner, np.minimum((np.asarray(final) * bins) // max(n, 1), bins - 1).astype(np.int64)), 1)
+    return tuple(stats) + (hist,)
+
+
+def merge_curves(na, a, nb, b):
+    # 两组 Welford 统计量 (次数 na / nb, 每组见 curve_stats) 用 Chan 等人的并行公式合并，不需要保留单次试验
+    na = np.asarray(na, dtype=np.float64)[..., None]
+    nb = np.asarray(nb, dtype=np.float64)[..., None]
+    n = np.maximum(na + nb, 1)
+    out = []
+    for mean_a, m2_a, mean_b, m2_b in ((a[0], a[1], b[0], b[1]), (a[2], a[3], b[2], b[3])):
+        delta = mean_b - mean_a
+        out += [mean_a + delta * nb / n, m2_a + m2_b + delta ** 2 * na * nb / n]
+    return tuple(out) + (a[4] + b[4],)
+
+
+def empty_curves(size, steps, bins):
+    return tuple(np.zeros((size, steps)) for _ in range(4)) + (np.zeros((size, bins)),)
+
+
+def outbreak_sizes(indptr, indices, nodes, beta, gamma, trials, rng, max_cells=1 << 24, curves=None):
+    # 把 (节点, 试验) 展开成行，按 max_cells 切批，返回每个节点 R 的和与平方和；
+    # curves = (steps, bins) 时再返回逐批合并的曲线统计量 (见 curve_stats)，内存只与 steps + bins 有关
+    n = indptr.size - 1
+    nodes = np.asarray(nodes, dtype=np.int64)
+    seeds = np.repeat(nodes, trials)
+    steps, bins = curves or (0, 0)
+    # 每行占 n 字节状态，记录曲线时再加两条 uint32 曲线
+    step = max(1, max_cells // max(n + 8 * steps, 1))
+    total = np.zeros(nodes.size, dtype=np.float64)
+    square = np.zeros(nodes.size, dtype=np.float64)
+    owner = np.repeat(np.arange(nodes.size), trials)
+    stats, seen = empty_curves(nodes.size, steps, bins), np.zeros(nodes.size)
+    for lo in range(0, seeds.size, step):
+        out = sir_batch(indptr, indices, seeds[lo:lo + step], beta, gamma, rng, steps)
+        sizes = (out[0] if steps else out).astype(np.float64)
+        batch = np.bincount(owner[lo:lo + step], minlength=nodes.size)
+        total += np.bincount(owner[lo:lo + step], weights=sizes, minlength=nodes.size)
+        square += np.bincount(owner[lo:lo + step], weights=sizes ** 2, minlength=nodes.size)
+        if steps:
+            stats = merge_curves(seen, stats, batch, curve_stats(owner[lo:lo + step], nodes.size, out[1], out[2], sizes, n, bins))
+            seen += batch
+    if curves is None:
+        return total, square
+    return total, square, stats
+
+
+def continuous_rates(beta, gamma):
+    # 离散步 (每步以 beta 感染每个易感邻居，再以 gamma 恢复) -> 连续时间速率 (每条 SI 边的感染率, 恢复率)。
+    # 离散模型中感染期 D ~ Geom(gamma)，一条边在恢复前传播的概率 T = beta / (beta + gamma - beta * gamma)；
+    # 连续模型中感染期 ~ Exp(mu)，T = lam / (lam + mu)。取 mu = gamma (平均感染期同为 1/gamma 步)，
+    # lam = beta / (1 - beta) 使两者的 T 完全相同，所以 beta 网格和阈值的含义不变。
+    # 两者只是感染期分布不同 (方差 (1-gamma)/gamma^2 对 1/gamma^2)，gamma 越小越接近
+    lam = np.inf if beta >= 1 else beta / (1 - beta)
+    return lam, gamma
+
+
+def gillespie_size(indptr, indices, seed, lam, mu, rng, state, times=False):
+    # 事件驱动的单次连续时间 SIR：堆里是 (感染时间, 节点)。节点被感染时抽出恢复时间，
+    # 再给每个邻居抽一个传播时间，只有早于恢复的才入堆；弹出时目标已被感染就丢弃。
+    # 代价与传播/恢复事件数成正比，与持续多少步无关。state 用完后恢复为全 S。
+    # times=True 时返回每个感染者的 (感染时间, 恢复时间) 而不是规模
+    heap = [(0.0, seed)]
+    touched, infected, recovered = [], [], []
+    while heap:
+        t, u = heapq.heappop(heap)
+        if state[u] != S:
+            continue
+        state[u] = I
+        touched.append(u)
+        recover = t + rng.exponential(1 / mu)
+        infected.append(t)
+        recovered.append(recover)
+        nbrs = indices[indptr[u]:indptr[u + 1]]
+        nbrs = nbrs[state[nbrs] == S]
+        if not nbrs.size or lam == 0:
+            continue
+        when = t + (np.zeros(nbrs.size) if lam == np.inf else rng.exponential(1 / lam, nbrs.size))
+        hit = when < recover
+        for w, v in zip(when[hit].tolist(), nbrs[hit].tolist()):
+            heapq.heappush(heap, (w, v))
+    state[touched] = S
+    if times:
+        return np.array(infected), np.array(recovered)
+    return len(touched)
+
+
+def sample_curve(infected, recovered, steps):
+    # 连续时间的感染/恢复时刻 -> t = 0, 1, ..., steps-1 (单位同离散模型的一步) 时的 I(t)、R(t)
+    grid = np.arange(steps)
+    R_t = np.searchsorted(np.sort(recovered), grid, side="right")
+    return np.searchsorted(np.sort(infected), grid, side="right") - R_t, R_t
+
+
+def gillespie_sizes(indptr, indices, nodes, beta, gamma, trials, rng, curves=None):
+    # 每个源节点跑 trials 次事件驱动模拟，返回 R 的和与平方和 (最终所有感染者都会恢复)；
+    # curves = (steps, bins) 时再返回曲线统计量，每个节点的试验逐个合并
+    lam, mu = continuous_rates(beta, gamma)
+    n = indptr.size - 1
+    state = np.zeros(n, dtype=np.uint8)
+    total = np.zeros(len(nodes), dtype=np.float64)
+    square = np.zeros(len(nodes), dtype=np.float64)
+    steps, bins = curves or (0, 0)
+    stats = empty_curves(len(nodes), steps, bins)
+    owner = np.zeros(trials, dtype=np.int64)
+    for i, u in enumerate(np.asarray(nodes, dtype=np.int64).tolist()):
+        if not steps:
+            sizes = np.array([gillespie_size(indptr, indices, u, lam, mu, rng, state) for _ in range(trials)], dtype=np.float64)
+        else:
+            runs = [gillespie_size(indptr, indices, u, lam, mu, rng, state, times=True) for _ in range(trials)]
+            sizes = np.array([infected.size for infected, _ in runs], dtype=np.float64)
+            I_t, R_t = (np.array(x) for x in zip(*(sample_curve(*run, steps) for run in runs)))
+            one = curve_stats(owner, 1, I_t, R_t, sizes, n, bins)
+            for k, x in enumerate(one):
+                stats[k][i] = x[0]
+        total[i], square[i] = sizes.sum(), (sizes ** 2).sum()
+    if curves is None:
+        return total, square
+    return total, square, stats
@@ -1,12 +1,14 @@
 import yaml
-import networkx as nx
+import json
+import numpy as np
 import os
 
-from utilize.tool import beta_threshold
+from utilize.kernel import csr_from_edges
+from utilize.tool import beta_threshold, file_hash, CSR_SUFFIX
 
 
-def load_betas(G, config):
-    crit = beta_threshold(G)
+def load_betas(G, config, path=None):
+    crit = beta_threshold(G, path)
 
     multipliers = config["training"]["beta"]
 
@@ -31,21 +33,126 @@ def load_config(path):
         return yaml.safe_load(f)
 
 
+class CSRGraph:
+    # 节点重编号为 0..N-1 的无向简单图；labels[i] 是原始节点编号。
+    # path 是 CSR 缓存目录 (若有)，多进程时 worker 直接映射其中的 .npy
+    def __init__(self, labels, indptr, indices, sha1=None, path=None):
+        self.labels = labels
+        self.indptr = indptr
+        self.indices = indices
+        self.sha1 = sha1
+        self.path = path
+        self._nx = None
+
+    def number_of_nodes(self):
+        return int(self.labels.size)
+
+    def number_of_edges(self):
+        return int(self.indices.size // 2)
+
+    def nodes(self):
+        return self.labels.tolist()
+
+    def edge_index(self):
+        owner = np.repeat(np.arange(self.number_of_nodes()), np.diff(self.indptr))
+        upper = owner < self.indices
+        return owner[upper], self.indices[upper].astype(np.int64)
+
+    def edges(self):
+        src, dst = self.edge_index()
+        return zip(self.labels[src].tolist(), self.labels[dst].tolist())
+
+    @property
+    def nx(self):
+        # 仍需要 networkx 的代码才会触发构建
+        if self._nx is None:
+            import networkx as nx
+
+            G = nx.Graph()
+            G.add_nodes_from(self.nodes())
+            G.add_edges_from(self.edges())
+            self._nx = G
+        return self._nx
+
+
+def parse_edges(path):
+    try:
+        edges = np.loadtxt(path, dtype=np.int64, usecols=(0, 1), ndmin=2, encoding="utf-8")
+    except ValueError:
+        # 列数不齐的文件退回逐行解析
+        edges = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2:
+                    edges.append((int(parts[0]), int(parts[1])))
+        edges = np.array(edges, dtype=np.int64).reshape(-1, 2)
+    return edges
+
+
+def build_csr(edges):
+    # 重编号、去自环、去重边；只出现在自环里的节点保留为孤立点
+    labels, ids = np.unique(edges, return_inverse=True)
+    ids = ids.reshape(-1, 2)
+    n = labels.size
+    ids = ids[ids[:, 0] != ids[:, 1]]
+    key = np.unique(np.minimum(ids[:, 0], ids[:, 1]) * n + np.maximum(ids[:, 0], ids[:, 1]))
+    indptr, indices = csr_from_edges(n, key // n, key % n)
+    return labels, indptr, indices
+
+
+def cached_meta(path):
+    # CSR 缓存仍然有效时返回其 meta.json，否则返回 None。
+    # 直接从压缩包导入的网络没有文本源文件，CSR 本身就是网络，总是有效
+    meta_path = os.path.join(path + CSR_SUFFIX, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if not os.path.exists(path):
+        return meta
+    stat = os.stat(path)
+    if meta["size"] != stat.st_size or meta["mtime_ns"] != stat.st_mtime_ns:
+        return None
+    return meta
+
+
+def write_csr(path, labels, indptr, indices, meta):
+    # 写 <path>.csr/{labels,indptr,indices}.npy 与 meta.json；meta.json 最后写，作为完成标记
+    cache = path + CSR_SUFFIX
+    os.makedirs(cache, exist_ok=True)
+    for key, arr in (("labels", labels), ("indptr", indptr), ("indices", indices)):
+        tmp = os.path.join(cache, f"{key}.tmp.npy")
+        np.save(tmp, arr)
+        os.replace(tmp, os.path.join(cache, f"{key}.npy"))
+    meta = dict(meta, nodes=int(labels.size), edges=int(indices.size // 2))
+    meta_path = os.path.join(cache, "meta.json")
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(meta_path + ".tmp", meta_path)
+    return meta
+
+
+def graph_size(path):
+    # (N, E)；没有缓存时按行数粗估，只用于调度排序
+    meta = cached_meta(path)
+    if meta is not None and "edges" in meta:
+        return meta["nodes"], meta["edges"]
+    lines = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            lines += block.count(b"\n")
+    return lines, lines
+
+
 def Graph(path):
-    edges = []
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            s = line.strip()
-            if not s:
-                continue
-            parts = s.split()
-            if len(parts) < 2:
-                continue
-            a, b = parts[0], parts[1]
-            a = int(a)
-            b = int(b)
-            edges.append((a, b))
-    G = nx.Graph()
-    G.add_edges_from(edges)
-    G.remove_edges_from(nx.selfloop_edges(G))
-    return G
+    cache = path + CSR_SUFFIX
+    meta = cached_meta(path)
+    if meta is not None and "edges" in meta:
+        arrays = [np.load(os.path.join(cache, f"{k}.npy"), mmap_mode="r") for k in ("labels", "indptr", "indices")]
+        return CSRGraph(*arrays, sha1=meta["sha1"], path=cache)
+
+    stat = os.stat(path)
+    labels, indptr, indices = build_csr(parse_edges(path))
+    meta = write_csr(path, labels, indptr, indices, {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": file_hash(path)})
+    return CSRGraph(labels, indptr, indices, sha1=meta["sha1"], path=cache)
@@ -0,0 +1,86 @@
+import os
+import sys
+import json
+import time
+import resource
+import threading
+from contextlib import contextmanager
+
+
+def peak_rss():
+    # 本进程的峰值常驻内存 (字节)；Linux 上 ru_maxrss 以 KiB 计，macOS 上以字节计
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def current_rss():
+    # 本进程当前的常驻内存 (字节)；没有 /proc 的平台退回峰值
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return peak_rss()
+
+
+def process_age():
+    # 本进程创建至今的秒数 (含解释器自身启动，精度为一个时钟节拍)；没有 /proc 的平台返回 None
+    try:
+        with open("/proc/self/stat") as f:
+            start = int(f.read().rsplit(")", 1)[1].split()[19]) / os.sysconf("SC_CLK_TCK")
+        with open("/proc/uptime") as f:
+            return float(f.read().split()[0]) - start
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Metrics:
+    # 每个阶段一行 JSON：墙钟时间、所在线程的 CPU 时间、主进程峰值内存，以及调用方给的附加字段。
+    # path 为 None 时只计时不写文件；多个网络的驱动线程共用一个实例
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, "a", encoding="utf-8") if path else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, record):
+        record = dict(record, time=time.time(), rss_peak=peak_rss())
+        if self.file is None:
+            return
+        with self.lock:
+            self.file.write(json.dumps(record) + "\n")
+            self.file.flush()
+
+    @contextmanager
+    def stage(self, network, stage, **extra):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield extra
+        finally:
+            self.write(dict(extra, network=network, stage=stage, wall=time.perf_counter() - wall,
+                            cpu=time.thread_time() - cpu))
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def summary(usage):
+    # tqdm 状态栏上的一行摘要
+    return f"{usage['trials_per_sec']:.0f} trials/s, idle {usage['idle']:.0%}, worker rss {usage['worker_rss_peak'] / (1 << 20):.0f} MiB"
+
+
+def worker_report(usage):
+    # 运行结束时的一行：worker 数，启动完成时与峰值常驻内存 (各 worker 的最小 / 最大)
+    workers = usage["workers"].values()
+    if not workers:
+        return "workers: none used"
+    start = [w["rss_start"] / (1 << 20) for w in workers]
+    peak = [w["rss_peak"] / (1 << 20) for w in workers]
+    return (f"workers: {len(start)}, rss at start {min(start):.0f}-{max(start):.0f} MiB, "
+            f"peak {min(peak):.0f}-{max(peak):.0f} MiB")
@@ -0,0 +1,268 @@
+import os
+import time
+import zlib
+import threading
+import multiprocessing as mp
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from utilize.kernel import beta_batch, merge_curves, CURVE_KEYS
+from utilize.checkpoint import load_checkpoint, save_checkpoint
+from utilize.worker import forget, measured, _init, _run
+
+
+def worker_context(start_method):
+    # forkserver (默认) 与 spawn 启动的 worker 不继承主进程导入的 ndlib / networkx 和已加载的图，
+    # forkserver 预先导入 utilize.worker，之后每个 worker 从它 fork，只有 numpy 与模拟内核；
+    # 平台不支持时 (如 Windows 没有 forkserver) 用平台默认方式
+    if start_method not in mp.get_all_start_methods():
+        start_method = None
+    ctx = mp.get_context(start_method)
+    if ctx.get_start_method() == "forkserver":
+        ctx.set_forkserver_preload(["utilize.worker"])
+    return ctx
+
+
+def half_width(totals, squares, counts, n, z):
+    # 爆发比例均值的置信区间半宽 (正态近似，样本方差)
+    c = np.maximum(counts, 1)
+    mean = totals / c
+    var = np.maximum(squares / c - mean ** 2, 0) * c / np.maximum(c - 1, 1)
+    return z * np.sqrt(var / c) / n
+
+
+class Published:
+    # 一张已发布的图：单进程时直接引用本地数组；多进程时 worker 直接映射 CSR 缓存目录 (path)，
+    # 没有缓存目录的图 (如 networkx 图) 复制到共享内存
+    def __init__(self, source, nodes, indptr, indices, shared, path=None):
+        self.source = source
+        self.nodes = nodes
+        self.shm = None
+        self.handle = None
+        self.local = None
+        self.twins = None
+        self.remote = None
+        if not shared:
+            self.local = (indptr, indices)
+            return
+        if path is not None:
+            self.handle = (os.path.abspath(path), indptr.size - 1, indices.size)
+            return
+        self.shm = shared_memory.SharedMemory(create=True, size=max(4, (indptr.size + indices.size) * 4))
+        buf = np.ndarray(indptr.size + indices.size, dtype=np.int32, buffer=self.shm.buf)
+        buf[:indptr.size] = indptr
+        buf[indptr.size:] = indices
+        del buf
+        self.handle = (self.shm.name, indptr.size - 1, indices.size)
+
+    def release(self):
+        if self.local is not None:
+            forget(("local", id(self)))
+        self.local = None
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+class GraphPool:
+    # 整个运行期间只开一个进程池；每张图只发布一次到共享内存，任务只携带
+    # (引擎, beta, 节点批, 试验块) 描述符。可同时发布多张图，供多个网络并行调度
+    def __init__(self, workers=0, node_batch=16, trial_chunk=250, checkpoint_interval=30.0, profile=None, task_memory_mb=256,
+                 cluster=None, start_method="forkserver"):
+        self.workers = workers or mp.cpu_count()
+        # csr 引擎每个任务的状态矩阵按内存上限切批：每格 1 字节状态，其余留给前沿数组
+        self.max_cells = max(1, (task_memory_mb << 20) // 4)
+        self.task_memory = task_memory_mb << 20
+        self.checkpoint_interval = checkpoint_interval
+        self.node_batch = node_batch
+        self.trial_chunk = trial_chunk
+        self.pool = None
+        # cluster: Coordinator 的参数 (address, lease_timeout, authkey)；给出时任务交给各主机上的
+        # script/worker.py 执行，本机不开进程池
+        self.coordinator = None
+        if cluster is not None:
+            from utilize.cluster import Coordinator
+
+            self.coordinator = Coordinator(**cluster)
+        elif self.workers > 1:
+            # 先启动 resource_tracker，让 worker 共用它，避免退出时误报泄漏
+            resource_tracker.ensure_running()
+            self.pool = worker_context(start_method).Pool(self.workers, initializer=_init, initargs=(profile,))
+        else:
+            _init(profile)
+        self.graphs = {}
+        self.latest = None
+        self.lock = threading.RLock()
+        # 每个 worker 的 [忙碌时间, CPU 时间, 单源模拟数, 峰值内存, 启动完成时的内存]
+        self.stats = {}
+        self.started = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def holds(self, source):
+        return id(source) in self.graphs
+
+    def graph(self, source=None):
+        return self.graphs[id(source)] if source is not None else self.graphs[self.latest]
+
+    def publish(self, source, nodes, indptr, indices, path=None):
+        with self.lock:
+            self.release(source)
+            self.graphs[id(source)] = Published(source, nodes, indptr, indices, self.pool is not None, path)
+            if self.coordinator is not None:
+                self.graphs[id(source)].remote = self.coordinator.publish(indptr, indices)
+            self.latest = id(source)
+
+    def release(self, source=None):
+        with self.lock:
+            keys = list(self.graphs) if source is None else [id(source)]
+            for key in keys:
+                if key in self.graphs:
+                    graph = self.graphs.pop(key)
+                    if self.coordinator is not None:
+                        self.coordinator.release(graph.remote)
+                    graph.release()
+
+    def close(self):
+        self.release()
+        if self.coordinator is not None:
+            self.coordinator.close()
+            self.coordinator = None
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def record(self, stats):
+        pid, wall, cpu, sims, rss, start_rss = stats
+        with self.lock:
+            busy = self.stats.setdefault(pid, [0.0, 0.0, 0, 0, start_rss])
+            busy[0] += wall
+            busy[1] += cpu
+            busy[2] += sims
+            busy[3] = max(busy[3], rss)
+
+    def usage(self):
+        # 吞吐与空闲：空闲时间 = worker 数 * 运行时长 - 各 worker 忙碌时间之和
+        with self.lock:
+            elapsed = time.monotonic() - self.started
+            busy = sum(s[0] for s in self.stats.values())
+            sims = sum(s[2] for s in self.stats.values())
+            workers = {str(pid): {"busy": s[0], "cpu": s[1], "trials": s[2], "trials_per_sec": s[2] / max(s[0], 1e-9),
+                                  "rss_peak": s[3], "rss_start": s[4]} for pid, s in self.stats.items()}
+        capacity = self.workers if self.pool is not None else 1
+        if self.coordinator is not None:
+            capacity = max(1, len(workers))
+        return {"elapsed": elapsed, "trials": sims, "trials_per_sec": sims / max(elapsed, 1e-9),
+                "idle": max(0.0, 1 - busy / max(capacity * elapsed, 1e-9)), "idle_seconds": max(0.0, capacity * elapsed - busy),
+                "worker_rss_peak": max((s["rss_peak"] for s in workers.values()), default=0),
+                "worker_rss_start": max((s["rss_start"] for s in workers.values()), default=0), "workers": workers}
+
+    def chunks(self, trials):
+        return [min(self.trial_chunk, trials - lo) for lo in range(0, trials, self.trial_chunk)]
+
+    def grid(self, kind, betas, size, trials):
+        # 全部任务 (beta 行, 节点批, 试验块序号, 试验数)，顺序固定以保证种子可复现。
+        # 渗流任务覆盖全部节点，按 beta 分组使累加数组不超过 task_memory (小图上仍是一组)
+        if kind == "percolation":
+            step = beta_batch(size, len(betas), self.task_memory)
+            return [(slice(lo, min(lo + step, len(betas))), slice(0, size), k, t)
+                    for lo in range(0, len(betas), step)
+                    for k, t in enumerate(self.chunks(trials))]
+        return [(b, slice(lo, min(lo + self.node_batch, size)), k, t)
+                for b in range(len(betas))
+                for lo in range(0, size, self.node_batch)
+                for k, t in enumerate(self.chunks(trials))]
+
+    def run(self, kind, betas, gamma, trials, nodes=None, seed=None, checkpoint=None, tol=None, z=1.96, source=None, scratch=None,
+            curves=None):
+        # 返回 (len(betas), len(nodes)) 的 R 之和、平方和与实际试验数。
+        # tol 不为 None 时按试验块分轮推进，置信区间半宽 < tol 的节点不再加试验；
+        # 给出 checkpoint 路径时，每隔 checkpoint_interval 秒原子地写一次进度，重启后跳过已完成任务；
+        # 给出 scratch 路径前缀时累加器是磁盘上的内存映射 (<scratch>.totals.npy 等)，不占常驻内存；
+        # curves = (steps, bins) 时再返回 CURVE_KEYS 对应的曲线累加器，形状 (len(betas), len(nodes), steps 或 bins)
+        graph = self.graph(source)
+        n = len(graph.nodes)
+        nodes = np.arange(n) if nodes is None else np.asarray(nodes, dtype=np.int64)
+        if kind == "percolation" and nodes.size != n:
+            raise ValueError("percolation engine computes all nodes at once")
+        if kind == "percolation" and curves is not None:
+            raise ValueError("percolation engine has no time dynamics, outbreak curves need csr / gillespie / ndlib")
+        grid = self.grid(kind, betas, nodes.size, trials)
+        shape = (len(betas), nodes.size)
+        shapes = {"totals": (shape, np.float64), "squares": (shape, np.float64), "counts": (shape, np.int64)}
+        if curves is not None:
+            steps, bins = curves
+            shapes.update({k: (shape + (bins if k == "hist" else steps,), np.float64) for k in CURVE_KEYS})
+        if scratch is None:
+            acc = {k: np.zeros(s, dtype=t) for k, (s, t) in shapes.items()}
+        else:
+            acc = {k: np.lib.format.open_memmap(f"{scratch}.{k}.npy", mode="w+", dtype=t, shape=s) for k, (s, t) in shapes.items()}
+        totals, squares, counts = acc["totals"], acc["squares"], acc["counts"]
+        done = np.zeros(len(grid), dtype=bool)
+
+        meta = {"kind": kind, "betas": [float(b) for b in betas], "gamma": gamma, "trials": trials,
+                "nodes": [int(nodes.size), zlib.crc32(nodes.tobytes())], "tol": tol, "z": z,
+                "node_batch": self.node_batch, "trial_chunk": self.trial_chunk, "task_memory": self.task_memory, "seed": seed,
+                "curves": None if curves is None else list(curves)}
+        state = load_checkpoint(checkpoint, meta)
+        if state is not None:
+            saved, done, seed = state
+            for k, a in acc.items():
+                a[...] = saved[k]
+        elif seed is None and checkpoint is not None:
+            seed = np.random.SeedSequence().entropy
+        meta["seed"] = seed
+        seeds = np.random.SeedSequence(seed).spawn(len(grid))
+
+        rounds = [range(len(grid))] if tol is None else \
+            [[i for i, g in enumerate(grid) if g[2] == k] for k in range(len(self.chunks(trials)))]
+        last = time.monotonic()
+        for round_ in rounds:
+            active = counts < trials
+            if tol is not None:
+                active &= (counts < 2) | (half_width(totals, squares, counts, n, z) >= tol)
+            todo = []
+            for i in round_:
+                rows, block, k, t = grid[i]
+                if done[i]:
+                    continue
+                if kind == "percolation":
+                    pos = block if active[rows].any() else None
+                else:
+                    pos = np.flatnonzero(active[rows, block]) + block.start
+                    pos = pos if pos.size else None
+                if pos is None:
+                    done[i] = True
+                    continue
+                todo.append((i, (kind, rows, tuple(betas[rows]) if kind == "percolation" else (betas[rows],), gamma,
+                                 nodes[pos], pos, t, seeds[i], self.max_cells, curves)))
+
+            if self.coordinator is not None:
+                results = self.coordinator.imap(graph.remote, todo)
+            elif self.pool is None:
+                results = ((i, measured(("local", id(graph)), *graph.local, task)) for i, task in todo)
+            else:
+                results = self.pool.imap_unordered(_run, ((graph.handle, i, task) for i, task in todo))
+            for i, ((rows, pos, t, total, square, curve), stats) in results:
+                self.record(stats)
+                totals[rows, pos] += total
+                squares[rows, pos] += square
+                if curve is not None:
+                    merged = merge_curves(counts[rows, pos], tuple(acc[k][rows, pos] for k in CURVE_KEYS), t, curve)
+                    for k, x in zip(CURVE_KEYS, merged):
+                        acc[k][rows, pos] = x
+                counts[rows, pos] += t
+                done[i] = True
+                if checkpoint is not None and time.monotonic() - last >= self.checkpoint_interval:
+                    save_checkpoint(checkpoint, meta, done, **acc)
+                    last = time.monotonic()
+        if curves is None:
+            return totals, squares, counts
+        return (totals, squares, counts) + tuple(acc[k] for k in CURVE_KEYS)
@@ -2,6 +2,9 @@ import os
 import json
 import shutil
 
+from utilize.store import append_column, store_path
+from utilize.tool import CSR_SUFFIX
+
 
 def create_folder(save_path, network_path):
     base_name = os.path.splitext(os.path.basename(network_path))[0]
@@ -19,5 +22,17 @@ def save_json(target_folder, data, base_name, beta):
         json.dump(data, f, ensure_ascii=False, indent=4)
     
 
+def save_store(target_folder, data, base_name, beta, field="mean", labels=None, **meta):
+    # data 是 {节点: 值} 字典，或与 labels 对齐的数组 (大图模式，不经过字典)
+    if labels is None:
+        labels, data = list(data.keys()), list(data.values())
+    append_column(store_path(target_folder, base_name), labels, data, beta, field, **meta)
+
+
 def save_networks(src_file, dst_file):
-    shutil.copy(src_file, dst_file)
\ No newline at end of file
+    if os.path.exists(src_file):
+        shutil.copy(src_file, dst_file)
+    else:
+        # 只有 CSR 的网络连同 CSR 目录一起复制
+        cache = src_file + CSR_SUFFIX
+        shutil.copytree(cache, os.path.join(dst_file, os.path.basename(cache)), dirs_exist_ok=True)
\ No newline at end of file
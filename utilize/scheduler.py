@@ -0,0 +1,78 @@
+import queue
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import psutil
+
+from utilize.kernel import beta_batch
+
+
+Job = namedtuple("Job", "name path nodes edges cost memory")
+
+
+def network_cost(N, E, n_betas, trials, gamma, sweep):
+    # 以访问的点/边数计的粗略工作量，只用于排序
+    if gamma == 1:
+        passes = 1 if sweep else n_betas
+        return trials * passes * (N + E)
+    # 每个源节点一次模拟，按平均扫到半张图估计
+    return n_betas * trials * N * (N + E) / 2
+
+
+def network_memory(N, E, workers, gamma, task_memory=256 << 20, n_betas=1):
+    # 共享 CSR + 原始编号 + 主进程的 (n_betas, N) 累加器 (n_betas 是一次 GraphPool.run 同时算的 beta 数，扫描模式为全部) +
+    # 每个 worker 的工作数组 (并查集与边表加上一组 beta 的累加数组及其回传副本 / 受 task_memory 限制的状态矩阵与前沿)
+    shared = 4 * (N + 1 + 2 * E) + 8 * N + 24 * n_betas * N
+    if gamma == 1:
+        per_worker = 48 * (N + E) + 2 * 16 * beta_batch(N, n_betas, task_memory) * N
+    else:
+        per_worker = task_memory + 16 * (N + E)
+    return shared + workers * per_worker
+
+
+def memory_limit(limit_gb):
+    if limit_gb:
+        return int(limit_gb * (1 << 30))
+    return int(psutil.virtual_memory().available * 0.8)
+
+
+def schedule(jobs, run, max_jobs, limit):
+    # 代价大的先跑 (LPT)；只在内存预算放得下时放行，放不下时让后面能放下的小任务先跑 (回填)。
+    # 没有任务在跑时无条件放行队首，单个超大图也不会永远等待。
+    # 各网络的 (beta, 节点批, 试验块) 任务都进同一个进程池队列，空闲 worker 取下一个任务，不论来自哪个网络。
+    # jobs 是 queue.Queue 时边到达边调度，收到 None 表示不再有新任务。
+    # 逐个 yield 已完成的 (job, future)
+    stream = jobs if isinstance(jobs, queue.Queue) else None
+    pending = [] if stream is not None else sorted(jobs, key=lambda j: j.cost, reverse=True)
+    running = {}
+    used = 0
+    with ThreadPoolExecutor(max_workers=max_jobs) as exe:
+        while pending or running or stream is not None:
+            if stream is not None:
+                # 无事可做时阻塞等新任务，否则只取已经到达的
+                while True:
+                    try:
+                        job = stream.get(block=not pending and not running)
+                    except queue.Empty:
+                        break
+                    if job is None:
+                        stream = None
+                        break
+                    pending.append(job)
+                pending.sort(key=lambda j: j.cost, reverse=True)
+            i = 0
+            while i < len(pending) and len(running) < max_jobs:
+                job = pending[i]
+                if not running or used + job.memory <= limit:
+                    running[exe.submit(run, job)] = job
+                    used += job.memory
+                    pending.pop(i)
+                else:
+                    i += 1
+            if not running:
+                continue
+            finished, _ = wait(running, timeout=None if stream is None else 0.5, return_when=FIRST_COMPLETED)
+            for future in finished:
+                job = running.pop(future)
+                used -= job.memory
+                yield job, future
@@ -1,10 +1,16 @@
-import ndlib.models.ModelConfig as mc
-import ndlib.models.epidemics as ep
 import numpy as np
-import multiprocessing as mp
+from statistics import NormalDist
 
+from utilize.kernel import csr_from_edges, twin_classes
+from utilize.pool import GraphPool, half_width
+
+
+def simulate(G, beta, gamma, node, curve=False):
+    # curve=True 时返回逐步的 (I 序列, R 序列)，第 0 项是初始状态。
+    # ndlib 连带导入 bokeh 等，要一秒多，只在用到参考引擎时导入
+    import ndlib.models.ModelConfig as mc
+    import ndlib.models.epidemics as ep
 
-def simulate(G, beta, gamma, node):
     model = ep.SIRModel(G)
     cfg = mc.Configuration()
     cfg.add_model_parameter("beta", beta)    
@@ -12,50 +18,243 @@ def simulate(G, beta, gamma, node):
     cfg.add_model_initial_configuration("Infected", [node])
     model.set_initial_status(cfg)
 
+    I_curve, R_curve = [], []
     while True:
         it = model.iteration()
         cnt = it["node_count"]  
         I_t = cnt.get(1, 0)
         R_t = cnt.get(2, 0)
+        if curve:
+            I_curve.append(I_t)
+            R_curve.append(R_t)
 
         if I_t == 0:
-            return R_t
-
-
-def _simulate_trials(args):
-    G, beta, gamma, node, num_trials = args
-    N = G.number_of_nodes()
-
-    results = []
-    for _ in range(num_trials):
-        R = simulate(G, beta, gamma, node)  
-        results.append(R / N)
-    
-    return results
-
-
-def sir_node(G, beta, gamma, node, trials):
-    cpu_count = mp.cpu_count() 
-    n_workers = min(cpu_count, trials) 
-    base, extra = divmod(trials, n_workers)
-    trial_splits = [base + (1 if i < extra else 0) for i in range(n_workers)]
-    
-    with mp.Pool(processes=n_workers) as pool:
-        tasks = [(G, beta, gamma, node, t) for t in trial_splits if t > 0]
-        results = pool.map(_simulate_trials, tasks)
-    all_results = np.concatenate(results)
-
-    return float(all_results.mean())
-    
-    
-
-def SIR(G, beta, gamma, trials):
-    details = {}
+            return (I_curve, R_curve) if curve else R_t
+
+
+def edge_arrays(G):
     nodes = list(G.nodes())
+    index = {u: i for i, u in enumerate(nodes)}
+    edges = np.array([(index[u], index[v]) for u, v in G.edges()], dtype=np.int64).reshape(-1, 2)
+    return nodes, edges[:, 0], edges[:, 1]
+
+
+def share(pool, G, labels=False):
+    # 返回节点编号列表；labels=True 时返回编号数组 (大图不展开成 Python 列表)
+    if not pool.holds(G):
+        if hasattr(G, "indptr"):
+            pool.publish(G, G.labels, G.indptr, G.indices, G.path)
+        else:
+            nodes, src, dst = edge_arrays(G)
+            pool.publish(G, nodes, *csr_from_edges(len(nodes), src, dst))
+    nodes = pool.graph(G).nodes
+    if labels:
+        return np.asarray(nodes)
+    return nodes.tolist() if isinstance(nodes, np.ndarray) else nodes
+
+
+def twins(pool, G):
+    # 结构孪生类 (见 kernel.twin_classes)，每张已发布的图只算一次
+    graph = pool.graph(G)
+    if graph.twins is None:
+        if hasattr(G, "indptr"):
+            indptr, indices = G.indptr, G.indices
+        else:
+            nodes, src, dst = edge_arrays(G)
+            indptr, indices = csr_from_edges(len(nodes), src, dst)
+        graph.twins = twin_classes(indptr, indices)
+    return graph.twins
+
+
+def fan_out(result, rep, reps):
+    # 只模拟了代表节点的 (B, len(reps)) 结果展开到全部节点，返回 (展开结果, 省下的单源模拟次数)
+    pos = np.searchsorted(reps, rep)
+    result = tuple(x[:, pos] for x in result)
+    counts = result[2]
+    return result, int(counts.sum() - counts[:, reps].sum())
+
+
+def resolve_engine(engine, gamma, curves=False):
+    # 渗流引擎只有最终规模，要爆发曲线时 auto 改用 csr
+    if engine == "auto":
+        engine = "percolation" if gamma == 1 and not curves else "csr"
+    if engine not in ("percolation", "csr", "gillespie", "ndlib"):
+        raise ValueError(f"unknown engine: {engine}")
+    if engine == "percolation" and gamma != 1:
+        raise ValueError(f"percolation engine requires gamma == 1, got {gamma}")
+    if engine == "percolation" and curves:
+        raise ValueError("percolation engine has no time dynamics, outbreak curves need csr / gillespie / ndlib")
+    return engine
+
+
+def sir_node(G, beta, gamma, node, trials, pool=None):
+    if pool is None:
+        with GraphPool() as pool:
+            return sir_node(G, beta, gamma, node, trials, pool)
+    nodes = share(pool, G)
+    total, _, count = pool.run("ndlib", [beta], gamma, trials, nodes=[nodes.index(node)], source=G)
+    return float(total[0, 0] / (count[0, 0] * len(nodes)))
+
+
+def ranking(nodes, means):
+    return dict(sorted(((u, float(m)) for u, m in zip(nodes, means)), key=lambda x: x[1], reverse=True))
+
+
+def z_score(confidence):
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+def curve_fields(curves, b, count, N):
+    # 第 b 个 beta 的曲线累加器 -> 保存用的字段：I/R 比例的均值与样本方差 (每个节点一行 steps 个值)，最终规模直方图
+    I_mean, I_m2, R_mean, R_m2, hist = (x[b] for x in curves)
+    c = np.maximum(np.asarray(count) - 1, 1)[:, None]
+    return {"I_mean": I_mean / N, "I_var": I_m2 / c / N ** 2, "R_mean": R_mean / N, "R_var": R_m2 / c / N ** 2,
+            "size_hist": np.asarray(hist)}
+
+
+def summarize(nodes, totals, squares, counts, details, saved=0, arrays=False, curves=()):
+    # 每个 beta 一个排名字典；details=True 时附带每个节点实际用掉的试验数和孪生约简省下的模拟次数。
+    # arrays=True 时逐个 beta 生成 (均值数组, 详情)，顺序同 nodes，不建字典。
+    # 给出曲线累加器 (见 GraphPool.run) 时详情里另有 "curves"：字段 -> 每个节点的曲线 (与 trials 一样是数组或字典)
+    N = len(nodes)
+    if arrays:
+        def per_beta():
+            for b, (total, count) in enumerate(zip(totals, counts)):
+                info = {"trials": np.asarray(count), "saved": saved}
+                if curves:
+                    info["curves"] = curve_fields(curves, b, count, N)
+                yield total / (np.maximum(count, 1) * N), info
+        return per_beta()
+    rankings = [ranking(nodes, total / (np.maximum(count, 1) * N)) for total, count in zip(totals, counts)]
+    if not details:
+        return rankings
+    out = []
+    for b, (r, count) in enumerate(zip(rankings, counts)):
+        info = {"trials": dict(zip(nodes, count.tolist())), "saved": saved}
+        if curves:
+            info["curves"] = {k: dict(zip(nodes, v)) for k, v in curve_fields(curves, b, count, N).items()}
+        out.append((r, info))
+    return out
+
+
+def SIR_sweep(G, betas, gamma, trials, seed=None, pool=None, checkpoint=None, tol=None, confidence=0.95, details=False,
+              arrays=False, scratch=None):
+    # arrays / scratch 用于大图：结果按 beta 逐个以数组给出，累加器放在磁盘上 (见 GraphPool.run)
+    if gamma != 1:
+        raise ValueError(f"sweep mode requires gamma == 1, got {gamma}")
+    if pool is None:
+        with GraphPool(workers=1) as pool:
+            return list(SIR_sweep(G, betas, gamma, trials, seed, pool, checkpoint, tol, confidence, details, arrays, scratch))
+    nodes = share(pool, G, labels=arrays)
+    result = pool.run("percolation", betas, gamma, trials, seed=seed, checkpoint=checkpoint, tol=tol, z=z_score(confidence),
+                      source=G, scratch=scratch)
+    return summarize(nodes, *result, details, arrays=arrays)
+
+
+def SIR(G, beta, gamma, trials, engine="auto", seed=None, pool=None, checkpoint=None, tol=None, confidence=0.95, details=False,
+        symmetry=False, arrays=False, scratch=None, curves=None):
+    # tol 不为 None 时按置信区间提前停止，trials 作为每个节点的上限；
+    # symmetry=True 时每个结构孪生类只模拟一个代表 (渗流引擎一次算出全部节点，不需要约简)；
+    # curves = (steps, bins) 时详情里附带每个节点的爆发曲线 (见 summarize)
+    engine = resolve_engine(engine, gamma, curves is not None)
+    if pool is None:
+        # 不传进程池时：向量化引擎单进程跑，ndlib 参考引擎用满所有 CPU
+        with GraphPool(workers=0 if engine == "ndlib" else 1) as pool:
+            return SIR(G, beta, gamma, trials, engine, seed, pool, checkpoint, tol, confidence, details, symmetry, arrays, scratch,
+                       curves)
+    nodes = share(pool, G, labels=arrays)
+    if not symmetry or engine == "percolation":
+        result = pool.run(engine, [beta], gamma, trials, seed=seed, checkpoint=checkpoint, tol=tol, z=z_score(confidence), source=G,
+                          scratch=scratch, curves=curves)
+        return next(iter(summarize(nodes, *result[:3], details, arrays=arrays, curves=result[3:])))
+    rep, reps = twins(pool, G)
+    result = pool.run(engine, [beta], gamma, trials, nodes=reps, seed=seed, checkpoint=checkpoint, tol=tol, z=z_score(confidence),
+                      source=G, scratch=scratch, curves=curves)
+    result, saved = fan_out(result, rep, reps)
+    return next(iter(summarize(nodes, *result[:3], details, saved, arrays, result[3:])))
+
+
+def topk_confidence(mean, se, order, k):
+    # 前 k 名里每个节点均值高于第 k+1 名的正态近似概率，取 Bonferroni 下界作为整体置信度
+    if k >= order.size:
+        return 1.0
+    out = order[k]
+    p = [NormalDist().cdf((mean[i] - mean[out]) / max(np.hypot(se[i], se[out]), 1e-12)) for i in order[:k]]
+    return float(max(0.0, 1.0 - sum(1.0 - x for x in p)))
+
+
+def SIR_topk(G, beta, gamma, top_k, budget, engine="auto", seed=None, pool=None, confidence=0.95, min_trials=10, symmetry=False,
+             arrays=False):
+    # 只关心前 top_k 名时的赛跑/逐次减半：先给所有节点少量试验，每轮淘汰置信上界低于
+    # 第 k 名置信下界的节点，确定进入前 k 的节点也不再加试验，剩余预算集中在边界附近。
+    # budget 是单源模拟的总次数；返回 (全部节点的排名字典, 详情)；arrays=True 时同 SIR 返回与节点编号对齐的数组
+    engine = resolve_engine(engine, gamma)
+    if pool is None:
+        with GraphPool(workers=0 if engine == "ndlib" else 1) as pool:
+            return SIR_topk(G, beta, gamma, top_k, budget, engine, seed, pool, confidence, min_trials, symmetry, arrays)
+    nodes = share(pool, G, labels=arrays)
+    N = len(nodes)
+    k = min(top_k, N)
+    z = z_score(confidence)
+    totals, squares, counts = (np.zeros(N) for _ in range(3))
+    # 孪生约简时只让各类代表参赛；前 k 个节点一定落在前 k 个代表的类里，所以 k 不变也不会漏
+    rep, reps = twins(pool, G) if symmetry and engine != "percolation" else (np.arange(N), np.arange(N))
+
+    if engine == "percolation":
+        # 一次渗流采样同时给出所有节点的样本，没有可淘汰的成本
+        totals, squares, counts = (x[0] for x in pool.run(engine, [beta], gamma, max(1, budget // N), seed=seed, source=G))
+    else:
+        rounds = max(1, int(np.ceil(np.log2(max(reps.size / k, 1)))) + 1)
+        seeds = np.random.SeedSequence(seed).generate_state(rounds).tolist()
+        active = reps
+        accepted = 0
+        spent = 0
+        for r in range(rounds):
+            if active.size == 0:
+                break
+            share_ = (budget - spent) // (rounds - r)
+            per_node = max(min_trials, share_ // active.size)
+            total, square, count = (x[0] for x in pool.run(engine, [beta], gamma, per_node, nodes=active, seed=seeds[r], source=G))
+            totals[active] += total
+            squares[active] += square
+            counts[active] += count
+            spent += int(count.sum())
 
-    for u in nodes:
-        mean = sir_node(G, beta, gamma, u, trials)
-        details[u] = {"mean": mean}
-    
-    return dict(sorted(((u, details[u]["mean"]) for u in nodes), key=lambda x: x[1], reverse=True))
+            slots = k - accepted
+            if r == rounds - 1 or slots <= 0 or active.size <= slots:
+                break
+            mean = totals[active] / (counts[active] * N)
+            hw = half_width(totals[active], squares[active], counts[active], N, z)
+            lower, upper = mean - hw, mean + hw
+            low_bar = np.sort(lower)[-slots]
+            high_bar = np.sort(upper)[-(slots + 1)]
+            inside = lower > high_bar
+            keep = (upper >= low_bar) & ~inside
+            accepted += int(inside.sum())
+            # 仍然太多时按均值再砍一半 (逐次减半)
+            remaining = slots - int(inside.sum())
+            if keep.sum() > 2 * remaining:
+                cut = max(2 * remaining, int(np.ceil(keep.sum() / 2)))
+                ranked = np.flatnonzero(keep)[np.argsort(-mean[keep], kind="stable")]
+                keep = np.zeros_like(keep)
+                keep[ranked[:cut]] = True
+            active = active[keep]
 
+    budget_used = int(counts.sum()) if engine != "percolation" else int(counts[0]) * N
+    (totals, squares, counts), saved = fan_out((totals[None], squares[None], counts[None]), rep, reps)
+    totals, squares, counts = totals[0], squares[0], counts[0]
+    mean = totals / (np.maximum(counts, 1) * N)
+    se = half_width(totals, squares, counts, N, 1.0)
+    order = np.argsort(-mean, kind="stable")
+    # 置信度在代表之间算：孪生的均值相同，放在一起比较没有意义。k_rep 是覆盖前 k 个节点所需的代表数
+    size = np.bincount(rep, minlength=N)[reps]
+    rank = np.argsort(-mean[reps], kind="stable")
+    k_rep = int(np.searchsorted(np.cumsum(size[rank]), k)) + 1
+    info = {
+        "trials": np.asarray(counts, dtype=np.int64) if arrays else dict(zip(nodes, counts.astype(int).tolist())),
+        "top_k": nodes[order[:k]].tolist() if arrays else [nodes[i] for i in order[:k]],
+        "confidence": topk_confidence(mean[reps], se[reps], rank, k_rep),
+        "budget_used": budget_used,
+        "saved": saved,
+    }
+    return (mean if arrays else ranking(nodes, mean)), info
@@ -0,0 +1,146 @@
+import os
+import json
+import shutil
+import struct
+
+import numpy as np
+
+
+# 每个网络一个列式二进制文件：
+#   magic(8) | N(uint64) | M(uint64) | 元数据 JSON (M 字节, 空格填充；写满时 M 翻倍，整个文件重写一次)
+#   | 节点编号 int64[N] | 列 float32[N] * ncols (每个 (beta, field) 一列，按写入顺序追加)
+# field 默认是 "mean" (平均爆发规模)，其它如 "trials" 记录每个节点实际用掉的试验数。
+# 每个节点不止一个值的字段 (如爆发曲线 I_mean 每个节点 steps 个值) 占 width 个相邻的物理列，元数据仍只记一项
+MAGIC = b"SIRSTORE"
+HEAD = struct.Struct("<8sQQ")
+META_BYTES = 1 << 16
+STORE_SUFFIX = ".sir"
+
+
+def store_path(target_folder, base_name):
+    return os.path.join(target_folder, base_name + STORE_SUFFIX)
+
+
+def _read_head(f):
+    magic, n, m = HEAD.unpack(f.read(HEAD.size))
+    if magic != MAGIC:
+        raise ValueError(f"not a result store: {f.name}")
+    meta = json.loads(f.read(m).decode("utf-8"))
+    return n, m, meta
+
+
+def _write_meta(f, meta, m):
+    raw = json.dumps(meta).encode("utf-8")
+    if len(raw) > m:
+        raise ValueError(f"store metadata exceeds {m} bytes")
+    f.seek(HEAD.size)
+    f.write(raw.ljust(m, b" "))
+
+
+def _grow(path, size):
+    # 元数据区放不下 size 字节时换成至少翻倍的元数据区，节点与列数据原样拷到后面
+    tmp = path + ".tmp"
+    with open(path, "rb") as f:
+        n, m, header = _read_head(f)
+        while m < size:
+            m *= 2
+        with open(tmp, "wb") as g:
+            g.write(HEAD.pack(MAGIC, n, m))
+            _write_meta(g, header, m)
+            shutil.copyfileobj(f, g, 1 << 24)
+    os.replace(tmp, path)
+
+
+def create_store(path, nodes):
+    nodes = np.sort(np.asarray(nodes, dtype=np.int64))
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEAD.pack(MAGIC, nodes.size, META_BYTES))
+        _write_meta(f, {"columns": []}, META_BYTES)
+        f.write(nodes.tobytes())
+    os.replace(tmp, path)
+
+
+def append_column(path, nodes, values, beta, field="mean", **meta):
+    # values 是每个节点一个值，或 (N, width) 每个节点一行；
+    # 同一个 (beta, field) 再写一次会覆盖原来那一列；元数据在列数据落盘后才更新
+    if not os.path.exists(path):
+        create_store(path, nodes)
+    with open(path, "r+b") as f:
+        n, m, header = _read_head(f)
+        stored = np.frombuffer(f.read(8 * n), dtype=np.int64)
+        nodes = np.asarray(nodes, dtype=np.int64)
+        order = np.argsort(nodes)
+        pos = order[np.minimum(np.searchsorted(nodes, stored, sorter=order), max(nodes.size - 1, 0))]
+        if nodes.size != n or not np.array_equal(nodes[pos], stored):
+            raise ValueError(f"node set does not match store: {path}")
+        values = np.asarray(values, dtype=np.float32)
+        column = values[pos].reshape(n, -1).T
+        entry = dict(meta, beta=beta, field=field)
+        if values.ndim == 2:
+            entry["width"] = column.shape[0]
+
+        columns = header["columns"]
+        idx = next((i for i, c in enumerate(columns) if c["beta"] == beta and c.get("field", "mean") == field), len(columns))
+        if idx < len(columns) and columns[idx].get("width", 1) != column.shape[0]:
+            raise ValueError(f"width of {field} at beta={beta} does not match store: {path}")
+        updated = dict(header, columns=columns[:idx] + [entry] + columns[idx + 1:])
+        size = len(json.dumps(updated).encode("utf-8"))
+        if size <= m:
+            data = HEAD.size + m + 8 * n
+            f.seek(data + sum(c.get("width", 1) for c in columns[:idx]) * 4 * n)
+            f.write(np.ascontiguousarray(column).tobytes())
+            if idx == len(columns):
+                f.truncate(data + sum(c.get("width", 1) for c in updated["columns"]) * 4 * n)
+            f.flush()
+            os.fsync(f.fileno())
+            _write_meta(f, updated, m)
+    if size > m:
+        _grow(path, size)
+        append_column(path, nodes, values, beta, field, **meta)
+
+
+def read_store(path):
+    # 返回 (节点编号, (N, 物理列数) 的 float32 矩阵, 每列元数据)，均为内存映射；
+    # 每列元数据里补上 offset (第一个物理列)，取值用 column_values
+    with open(path, "rb") as f:
+        n, m, header = _read_head(f)
+    columns = header["columns"]
+    offset = 0
+    for c in columns:
+        c["offset"] = offset
+        offset += c.get("width", 1)
+    nodes = np.memmap(path, dtype=np.int64, mode="r", offset=HEAD.size + m, shape=(n,)) if n else np.zeros(0, np.int64)
+    if n and offset:
+        matrix = np.memmap(path, dtype=np.float32, mode="r", offset=HEAD.size + m + 8 * n, shape=(offset, n)).T
+    else:
+        matrix = np.zeros((n, offset), dtype=np.float32)
+    return nodes, matrix, columns
+
+
+def column_values(matrix, column):
+    # 一列的取值：(N,)，宽字段为 (N, width)
+    if "width" not in column:
+        return matrix[:, column["offset"]]
+    return matrix[:, column["offset"]:column["offset"] + column["width"]]
+
+
+def stored_betas(path, field="mean"):
+    if not os.path.exists(path):
+        return set()
+    return {c["beta"] for c in read_store(path)[2] if c.get("field", "mean") == field}
+
+
+def export_json(path, target_folder=None):
+    # 转回原来每个 beta 一个 JSON 的格式
+    from utilize.save import save_json
+
+    target_folder = target_folder or os.path.dirname(path)
+    base_name = os.path.basename(path)[: -len(STORE_SUFFIX)]
+    nodes, matrix, columns = read_store(path)
+    for column in columns:
+        if column.get("field", "mean") != "mean":
+            continue
+        values = column_values(matrix, column).astype(float)
+        data = dict(sorted(zip(nodes.tolist(), values.tolist()), key=lambda x: x[1], reverse=True))
+        save_json(target_folder, data, base_name, column["beta"])
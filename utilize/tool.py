@@ -1,6 +1,7 @@
 import numpy as np
 import os
-import networkx as nx
+import json
+import hashlib
 import math
 
 """
@@ -34,25 +35,100 @@ def network_critical(G):
 """
 
 
-def beta_threshold(G):
-    A = nx.to_numpy_array(G, dtype=float, weight=None)
-    if A.size == 0:
-        return math.inf
+THRESHOLD_SUFFIX = ".threshold.json"
+CSR_SUFFIX = ".csr"
+CACHE_SUFFIXES = (THRESHOLD_SUFFIX, CSR_SUFFIX)
+
+
+def file_hash(path, chunk=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def power_iteration(A, tol=1e-9, maxiter=10000):
+    # 对 A + I 做幂迭代：谱整体右移 1，避免二部图 ±lambda 来回振荡
+    x = np.ones(A.shape[0]) / np.sqrt(A.shape[0])
+    lam = 0.0
+    for _ in range(maxiter):
+        y = A @ x + x
+        norm = np.linalg.norm(y)
+        if norm == 0:
+            return 0.0
+        y /= norm
+        new = float(y @ (A @ y))
+        if abs(new - lam) <= tol * max(1.0, abs(new)):
+            return new
+        x, lam = y, new
+    return lam
+
+
+def spectral_radius(A):
+    from scipy.sparse.linalg import eigsh, eigs, ArpackNoConvergence
+
+    n = A.shape[0]
+    if A.nnz == 0:
+        # 没有边 (如只有自环的文件)：A @ v0 为零，ARPACK 会报起始向量为零
+        return 0.0
+    if n < 3:
+        return float(np.max(np.abs(np.linalg.eigvals(A.toarray()))))
+    # 固定起始向量：ARPACK 默认随机起点，阈值 (进而每个 beta) 的末几位会随运行变化；
+    # 全 1 向量与非负的 Perron 向量不正交，也不随节点重排而变
+    v0 = np.ones(n)
+    try:
+        if (A != A.T).nnz == 0:         # 对称 -> Lanczos 取最大代数特征值
+            return float(eigsh(A, k=1, which="LA", v0=v0, return_eigenvectors=False)[0])
+        return float(np.abs(eigs(A, k=1, which="LM", v0=v0, return_eigenvectors=False)[0]))
+    except ArpackNoConvergence:
+        return power_iteration(A)
+
+
+def adjacency(G):
+    # scipy / networkx 只在需要重新计算阈值时导入
+    from scipy.sparse import csr_array
+
+    if hasattr(G, "indptr"):
+        n = G.number_of_nodes()
+        return csr_array((np.ones(G.indices.size), G.indices, G.indptr), shape=(n, n))
+    import networkx as nx
+
+    return nx.to_scipy_sparse_array(G, dtype=float, weight=None, format="csr")
+
+
+def beta_threshold(G, path=None):
+    # 1 / lambda_max；给出网络文件路径时，结果按文件内容哈希缓存在旁边
+    if path is not None:
+        cache = path + THRESHOLD_SUFFIX
+        key = getattr(G, "sha1", None) or file_hash(path)
+        if os.path.exists(cache):
+            with open(cache, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("sha1") == key:
+                return saved["threshold"]
 
-    if np.allclose(A, A.T):          # 对称 -> 实特征值，直接取最大
-        lam_max = float(np.linalg.eigvalsh(A).max())
-    else:                             # 非对称 -> 取最大模长
-        evals = np.linalg.eigvals(A)
-        lam_max = float(np.max(np.abs(evals)))
+    if G.number_of_nodes() == 0:
+        threshold = math.inf
+    else:
+        A = adjacency(G)
+        lam_max = spectral_radius(A)
+        threshold = math.inf if lam_max <= 0 else float(1 / lam_max)
 
-    if lam_max <= 0:
-        return math.inf
-    return float(1 / lam_max)
+    if path is not None:
+        tmp = cache + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"sha1": key, "threshold": threshold}, f)
+        os.replace(tmp, cache)
+    return threshold
 
 
 
 def name_to_path(network_name, path):
     folder = os.path.join(path, network_name)
-    f = os.listdir(folder)[0]
-    file_path = os.path.join(folder, f)
+    files = sorted(f for f in os.listdir(folder) if not f.endswith(CACHE_SUFFIXES))
+    if not files:
+        # 只有 CSR 的网络 (从压缩包直接导入)：返回其名义上的源文件路径
+        files = sorted(f[: -len(CSR_SUFFIX)] for f in os.listdir(folder) if f.endswith(CSR_SUFFIX))
+    file_path = os.path.join(folder, files[0])
     return file_path
\ No newline at end of file
@@ -0,0 +1,150 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from utilize.kernel import index_dtype, gillespie_sizes, outbreak_sizes, percolation_sizes, sweep_sizes, curve_stats, pad_curve
+from utilize.metrics import peak_rss, current_rss
+
+
+# worker 进程一侧：挂载共享的 CSR 并执行任务描述符。只依赖 numpy 与模拟内核，
+# forkserver / spawn 启动的 worker 只导入本模块 (ndlib、networkx 仅在 ndlib 参考引擎里按需导入)
+
+MAX_ATTACHED = 8
+
+_attached = OrderedDict()
+_graphs = {}
+_profiler = None
+_profile_dir = None
+_profile_lock = threading.Lock()
+_start_rss = None
+
+
+def attach(handle):
+    # worker 端只读挂载 CSR：name 是共享内存名，或 CSR 缓存目录 (直接内存映射 .npy，不经过共享内存复制)。
+    # 多个网络并行时最多保留 MAX_ATTACHED 张，按最近使用淘汰
+    name, n, nnz = handle
+    if name in _attached:
+        _attached.move_to_end(name)
+    else:
+        while len(_attached) >= MAX_ATTACHED:
+            old, mapped = _attached.popitem(last=False)
+            forget(old)
+            if isinstance(mapped, shared_memory.SharedMemory):
+                mapped.close()
+        if os.path.isdir(name):
+            _attached[name] = tuple(np.load(os.path.join(name, f"{k}.npy"), mmap_mode="r") for k in ("indptr", "indices"))
+        else:
+            _attached[name] = shared_memory.SharedMemory(name=name)
+    mapped = _attached[name]
+    if isinstance(mapped, tuple):
+        return mapped
+    buf = np.ndarray(n + 1 + nnz, dtype=np.int32, buffer=mapped.buf)
+    buf.flags.writeable = False
+    return buf[:n + 1], buf[n + 1:]
+
+
+def forget(key):
+    # 丢掉按图缓存的 networkx 图与边表
+    _graphs.pop(key, None)
+    _graphs.pop((key, "edges"), None)
+
+
+def edge_list(key, indptr, indices):
+    # 渗流引擎用的上三角边表 (int32)，每个 worker 每张图只建一次
+    if (key, "edges") not in _graphs:
+        n = indptr.size - 1
+        owner = np.repeat(np.arange(n, dtype=index_dtype(n)), np.diff(indptr))
+        upper = owner < indices
+        _graphs[(key, "edges")] = owner[upper], np.asarray(indices)[upper]
+    return _graphs[(key, "edges")]
+
+
+def nx_graph(key, indptr, indices):
+    # ndlib 参考引擎需要 networkx 图，每个 worker 每张图只建一次
+    if key not in _graphs:
+        import networkx as nx
+
+        G = nx.Graph()
+        G.add_nodes_from(range(indptr.size - 1))
+        rows = np.repeat(np.arange(indptr.size - 1), np.diff(indptr))
+        G.add_edges_from(zip(rows.tolist(), indices.tolist()))
+        _graphs[key] = G
+    return _graphs[key]
+
+
+def execute(key, indptr, indices, task):
+    kind, rows, betas, gamma, nodes, pos, trials, seed, max_cells, curves = task
+    rng = np.random.default_rng(seed)
+    n = indptr.size - 1
+    stats = []
+
+    if kind == "percolation":
+        src, dst = edge_list(key, indptr, indices)
+        if len(betas) == 1:
+            total, square = (x[None, :] for x in percolation_sizes(n, src, dst, betas[0], trials, rng))
+        else:
+            total, square = sweep_sizes(n, src, dst, betas, trials, rng)
+    elif kind == "csr":
+        total, square, *stats = outbreak_sizes(indptr, indices, nodes, betas[0], gamma, trials, rng, max_cells, curves)
+    elif kind == "gillespie":
+        total, square, *stats = gillespie_sizes(indptr, indices, nodes, betas[0], gamma, trials, rng, curves)
+    elif kind == "ndlib":
+        from utilize.sir import simulate
+
+        np.random.seed(rng.integers(2 ** 32))
+        G = nx_graph(key, indptr, indices)
+        if curves is None:
+            sizes = np.array([[simulate(G, betas[0], gamma, int(u)) for _ in range(trials)] for u in nodes], dtype=np.float64)
+        else:
+            runs = [pad_curve(*simulate(G, betas[0], gamma, int(u), curve=True), curves[0]) for u in nodes for _ in range(trials)]
+            sizes = np.array([final for _, _, final in runs], dtype=np.float64)
+            stats = [curve_stats(np.repeat(np.arange(len(nodes)), trials), len(nodes), np.array([r[0] for r in runs]),
+                                 np.array([r[1] for r in runs]), sizes, n, curves[1])]
+            sizes = sizes.reshape(len(nodes), trials)
+        total, square = sizes.sum(axis=1), (sizes ** 2).sum(axis=1)
+    else:
+        raise ValueError(f"unknown engine: {kind}")
+    return rows, pos, trials, total, square, stats[0] if stats else None
+
+
+def _init(profile_dir):
+    # worker 启动时调用；给出 profile_dir 时用 cProfile 记录每个任务，累计结果写到 worker-<pid>.prof。
+    # 同时记下启动完成时的常驻内存，随每个任务的统计交回
+    global _profiler, _profile_dir, _start_rss
+    if profile_dir:
+        import cProfile
+
+        os.makedirs(profile_dir, exist_ok=True)
+        _profiler = cProfile.Profile()
+        _profile_dir = profile_dir
+    _start_rss = current_rss()
+
+
+def _measured(key, indptr, indices, task):
+    wall, cpu = time.perf_counter(), time.thread_time()
+    result = execute(key, indptr, indices, task)
+    sims = result[2] * np.size(result[3])
+    return result, (os.getpid(), time.perf_counter() - wall, time.thread_time() - cpu, int(sims), peak_rss(), _start_rss or 0)
+
+
+def measured(key, indptr, indices, task):
+    # 执行一个任务并返回 (结果, (pid, 墙钟时间, CPU 时间, 单源模拟数, 峰值内存, 启动时内存))
+    if _profiler is None:
+        return _measured(key, indptr, indices, task)
+    # 同一个 Profile 不能在多个线程里同时启用 (单进程模式下多个网络的驱动线程会并发调用)
+    with _profile_lock:
+        _profiler.enable()
+        try:
+            return _measured(key, indptr, indices, task)
+        finally:
+            _profiler.disable()
+            _profiler.dump_stats(os.path.join(_profile_dir, f"worker-{os.getpid()}.prof"))
+
+
+def _run(task):
+    handle, i, task = task
+    return i, measured(handle[0], *attach(handle), task)